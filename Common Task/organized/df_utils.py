@@ -1,106 +1,257 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import as_completed
+
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 from utils import *
 
-def get_time_zone(city):
-    city_info = get_city_info()
-    return city_info[city]["tz"]
+# Calendar dimension
+# The hourly loaders used to expand date_time into 11 calendar columns on every row (date and time as Python
+# objects), and the merges dropped most of them again right away. Instead each timezone has one calendar table
+# keyed by epoch seconds, filled once per distinct timestamp, and a step joins only the features it needs.
+# The tables are capped: at most CALENDAR_MAX_TIMEZONES of them (the least recently used one is dropped), and a
+# table that would go over CALENDAR_MAX_ROWS starts over from the timestamps of the current request.
+CALENDAR_FEATURES = ['date', 'year', 'month', 'day', 'hour', 'minute', 'second', 'day_of_year', 'sin_day', 'cos_day']
+CALENDAR_MAX_TIMEZONES = 8
+# hourly since 1940 is ~750k timestamps, so this holds a full Open-Meteo backfill plus the WRH observations
+CALENDAR_MAX_ROWS = 2_000_000
+calendar_tables = {}
+
+def get_epoch_seconds(times):
+    return ((times - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype='int64')
+
+def build_calendar(timezone, epochs):
+    local = pd.to_datetime(epochs, unit='s', utc=True).tz_convert(timezone)
+    calendar = pd.DataFrame({
+        # local calendar day as a tz-naive timestamp, so day level joins don't go through Python date objects
+        'date': local.tz_localize(None).normalize(),
+        'year': local.year,
+        'month': local.month,
+        'day': local.day,
+        'hour': local.hour,
+        'minute': local.minute,
+        'second': local.second,
+        'day_of_year': local.dayofyear,
+    }, index=pd.Index(epochs, name='epoch'))
+    # sin ad cos of the day of the year
+    calendar['sin_day'] = np.sin(2 * np.pi * calendar['day_of_year']/365)
+    calendar['cos_day'] = np.cos(2 * np.pi * calendar['day_of_year']/365)
+    return calendar
+
+def get_calendar(timezone, epochs):
+    # grows the timezone's table with any timestamps it hasn't seen yet
+    calendar = calendar_tables.pop(timezone, None)
+    unique = pd.unique(epochs)
+    if calendar is not None:
+        missing = unique[calendar.index.get_indexer(unique) == -1]
+        if len(calendar) + len(missing) > CALENDAR_MAX_ROWS:
+            calendar = None
+        else:
+            unique = missing
+    if calendar is None or len(unique) > 0:
+        new_rows = build_calendar(timezone, unique)
+        calendar = new_rows if calendar is None else pd.concat([calendar, new_rows]).sort_index()
+    # re-inserted last, so the first key is always the least recently used timezone
+    calendar_tables[timezone] = calendar
+    while len(calendar_tables) > CALENDAR_MAX_TIMEZONES:
+        del calendar_tables[next(iter(calendar_tables))]
+    return calendar
+
+def add_calendar_features(df, features=CALENDAR_FEATURES, on='date_time'):
+    # joins calendar columns for the local time in `on` (tz-aware), skipping the ones df already has
+    features = [feature for feature in features if feature not in df.columns]
+    if not features or len(df) == 0:
+        return df
+    epochs = get_epoch_seconds(df[on])
+    calendar = get_calendar(str(df[on].dt.tz), epochs)
+    rows = calendar.index.get_indexer(epochs)
+    df = df.copy()
+    for feature in features:
+        df[feature] = calendar[feature].to_numpy()[rows]
+    return df
+
+# Load schemas
+# What the feature pipeline uses from each source. Loaders read only these columns (usecols on the csv, column
+# projection on the store) instead of parsing everything and dropping most of it right after.
+# columns: columns to keep (None keeps all), exclude: columns never read,
+# numeric: every column but the time column is parsed straight to float64 (no type inference)
+LOAD_SCHEMAS = {
+    "NOAA": {
+        "columns": None,
+        "exclude": ['atobstemperature', 'snowdepth', 'hdd', 'hdddeparture', 'cdd', 'cdddeparture', 'gdd',
+                    'snowfallnormal', 'snowfalldeparture'],
+        "numeric": True,
+    },
+    "OM": {"columns": None, "exclude": [], "numeric": True},
+    # merge_hourly only keeps the terrestrial radiation
+    "Solar_Soil": {"columns": ['date', 'terrestrial_radiation', 'terrestrial_radiation_instant'], "exclude": [], "numeric": True},
+    "Air_Quality": {
+        "columns": None,
+        "exclude": ['ammonia', 'alder_pollen', 'birch_pollen', 'grass_pollen', 'mugwort_pollen', 'olive_pollen', 'ragweed_pollen'],
+        "numeric": True,
+    },
+    # MesoWest columns come and go per station and year, so WRH is declared by what it leaves out
+    "WRH": {
+        "columns": None,
+        "exclude": ['cloud_layer_2_code_set_1', 'sea_level_pressure_set_1',
+            'cloud_layer_3_code_set_1', 'air_temp_high_6_hour_set_1',
+            'air_temp_low_6_hour_set_1', 'pressure_change_code_set_1',
+            'precip_accum_one_hour_set_1', 'weather_cond_code_set_1',
+            'precip_accum_six_hour_set_1', 'wind_gust_set_1',
+            'peak_wind_speed_set_1', 'pressure_tendency_set_1',
+            'precip_accum_24_hour_set_1', 'precip_accum_three_hour_set_1',
+            'snow_depth_set_1', 'air_temp_high_24_hour_set_1',
+            'air_temp_low_24_hour_set_1', 'ceiling_set_1',
+            'peak_wind_direction_set_1', 'dew_point_temperature_set_1',
+            'metar_origin_set_1', 'weather_condition_set_1d',
+            'cloud_layer_2_set_1d', 'cloud_layer_3_set_1d', 'wind_chill_set_1d',
+            'heat_index_set_1d', 'metar_set_1', 'cloud_layer_1_set_1d', 'weather_summary_set_1d'],
+        "numeric": False,
+    },
+}
+
+def get_projection(path):
+    # columns (and csv dtypes) in the source's load schema
+    city, source = parse_data_path(path)
+    schema = LOAD_SCHEMAS[source]
+    columns = [column for column in get_source_columns(path)
+               if (schema["columns"] is None or column.lower() in schema["columns"]) and column.lower() not in schema["exclude"]]
+    dtype = None
+    if schema["numeric"]:
+        time_column = STORE_SCHEMAS[source]["time_column"]
+        dtype = {column: 'float64' for column in columns if column != time_column}
+    return columns, dtype
+
+def read_projected(path, start=None, end=None):
+    # read_source limited to the columns in the source's load schema
+    columns, dtype = get_projection(path)
+    return read_source(path, start=start, end=end, columns=columns, dtype=dtype)
 
-def load_NOAA_df(path):
-    df = pd.read_csv(path)
+# Observation cadence
+# WRH reports every 5 to 20 minutes, but merge_hourly only keeps the top of the hour. load_WRH_df streams the
+# source in chunks and keeps only the observations on the cadence grid (local minutes since midnight divisible
+# by the rule, so 'h' is the old minute == 0 filter), so the timezone conversion, one-hot encoding and dropna
+# only run on those rows. On the csv most rows are dropped from the raw strings before any time is parsed.
+WRH_CADENCE = 'h'
+WRH_CHUNKSIZE = 100000
+
+def get_cadence_minutes(rule):
+    minutes = pd.Timedelta(pd.tseries.frequencies.to_offset(rule)).total_seconds() / 60
+    if minutes < 1 or minutes != int(minutes):
+        raise RuntimeError(f"cadence {rule} is not a whole number of minutes")
+    return int(minutes)
+
+def on_cadence(times, minutes):
+    # times are local (tz-aware)
+    return ((times.dt.hour * 60 + times.dt.minute) % minutes) == 0
+
+def has_whole_hour_offsets(timezone):
+    # true when local minutes always equal UTC minutes (every US zone), checked monthly so both DST states are seen
+    probe = pd.date_range('1970-01-01', '2040-01-01', freq='MS', tz='UTC')
+    offsets = probe.tz_convert(timezone).tz_localize(None) - probe.tz_localize(None)
+    return bool((offsets % pd.Timedelta(hours=1) == pd.Timedelta(0)).all())
+
+def get_cadence_prefilter(minutes, timezone, time_column):
+    # mask over raw iso strings that keeps every row that can be on the grid. Only the minute field is checked,
+    # rows whose utc offset isn't whole hours are kept for the exact check after parsing.
+    if not has_whole_hour_offsets(timezone):
+        return None
+    step = np.gcd(minutes, 60)
+    def prefilter(df):
+        strings = df[time_column]
+        minute = pd.to_numeric(strings.str.slice(14, 16), errors='coerce')
+        tail = strings.str.slice(-2)
+        whole_offset = (tail == '00') | ~tail.str.isdigit().fillna(False)
+        return (minute % step == 0) | minute.isna() | ~whole_offset
+    return prefilter
+
+# Loaders read through read_projected/read_source, which use the partitioned store when the source has been
+# migrated (only the partitions between start and end are opened) and fall back to the csv otherwise.
+def load_NOAA_df(path, start=None, end=None):
+    df = read_projected(path, start=start, end=end)
     df.columns = df.columns.str.lower()
     df['date'] = pd.to_datetime(df['date'])
-    df = df.drop(columns=['atobstemperature'])
+    df = df.drop(columns=['atobstemperature'], errors='ignore')
     df['precipitation'] = df['precipitationnormal'] + df['precipitationdeparture']
     return df
 
-def load_OM_df(path):
-    df = pd.read_csv(path)
+def load_OM_df(path, start=None, end=None):
+    df = read_projected(path, start=start, end=end)
     df.columns = df.columns.str.lower()
-    df['date'] = df['date'].str.split(' ').str[0]
-    df['date'] = pd.to_datetime(df['date'])
+    # dates are stored as UTC midnight, keep just the calendar date
+    df['date'] = parse_times(df['date']).dt.tz_convert(None).dt.normalize()
     return df
 
-def load_Solar_Soil_df(path):
-   df = pd.read_csv(path)
+def load_Solar_Soil_df(path, start=None, end=None):
+   df = read_projected(path, start=start, end=end)
    df.columns = df.columns.str.lower()
-   df['date'] = pd.to_datetime(df['date'], utc=True)
+   df['date'] = parse_times(df['date'])
    city_name = path.split('/')[-1].split('_')[0]
    timezone = get_time_zone(city_name)
    # relocalize to the correct timezone
    df['date'] = df['date'].dt.tz_convert(timezone)
-   # rename date to date_time
+   # rename date to date_time, calendar features are joined later by the steps that need them
    df = df.rename(columns={'date': 'date_time'})
-   df['date'] = df['date_time'].dt.date
-   df['time'] = df['date_time'].dt.time
-   df['year'] = df['date_time'].dt.year
-   df['month'] = df['date_time'].dt.month
-   df['day'] = df['date_time'].dt.day
-   df['hour'] = df['date_time'].dt.hour
-   df['minute'] = df['date_time'].dt.minute
-   df['second'] = df['date_time'].dt.second
-   df['day_of_year'] = df['date_time'].dt.dayofyear
-   # sin ad cos of the day of the year
-   df['sin_day'] = np.sin(2 * np.pi * df['day_of_year']/365)
-   df['cos_day'] = np.cos(2 * np.pi * df['day_of_year']/365)
    return df
 
-def load_Air_Quality_df(path):
-   df = pd.read_csv(path)
+def load_Air_Quality_df(path, start=None, end=None):
+   df = read_projected(path, start=start, end=end)
    df.columns = df.columns.str.lower()
-   df['date'] = pd.to_datetime(df['date'], utc=True)
+   df['date'] = parse_times(df['date'])
    city_name = path.split('/')[-1].split('_')[0]
    timezone = get_time_zone(city_name)
    df['date'] = df['date'].dt.tz_convert(timezone)
    df = df.rename(columns={'date': 'date_time'})
-   df['date'] = df['date_time'].dt.date
-   df['time'] = df['date_time'].dt.time
-   df['year'] = df['date_time'].dt.year
-   df['month'] = df['date_time'].dt.month
-   df['day'] = df['date_time'].dt.day
-   df['hour'] = df['date_time'].dt.hour
-   df['minute'] = df['date_time'].dt.minute
-   df['second'] = df['date_time'].dt.second
-   df['day_of_year'] = df['date_time'].dt.dayofyear
-   # sin ad cos of the day of the year
-   df['sin_day'] = np.sin(2 * np.pi * df['day_of_year']/365)
-   df['cos_day'] = np.cos(2 * np.pi * df['day_of_year']/365)
    return df
 
-def load_WRH_df(path):
-    df = pd.read_csv(path)
-    df.columns = df.columns.str.lower()
-    df = df.drop(columns=['cloud_layer_2_code_set_1', 'sea_level_pressure_set_1',
-        'cloud_layer_3_code_set_1', 'air_temp_high_6_hour_set_1',
-        'air_temp_low_6_hour_set_1', 'pressure_change_code_set_1',
-        'precip_accum_one_hour_set_1', 'weather_cond_code_set_1',
-        'precip_accum_six_hour_set_1', 'wind_gust_set_1',
-        'peak_wind_speed_set_1', 'pressure_tendency_set_1',
-        'precip_accum_24_hour_set_1', 'precip_accum_three_hour_set_1',
-        'snow_depth_set_1', 'air_temp_high_24_hour_set_1',
-        'air_temp_low_24_hour_set_1', 'ceiling_set_1',
-        'peak_wind_direction_set_1', 'dew_point_temperature_set_1',
-        'metar_origin_set_1', 'weather_condition_set_1d',
-        'cloud_layer_2_set_1d', 'cloud_layer_3_set_1d', 'wind_chill_set_1d',
-        'heat_index_set_1d', 'metar_set_1', 'cloud_layer_1_set_1d', 'weather_summary_set_1d'], errors='ignore')
-    df['date_time'] = pd.to_datetime(df['date_time'], utc=True)
-    # relocalize to the correct timezone
+def load_WRH_df(path, start=None, end=None, cadence=WRH_CADENCE, chunksize=WRH_CHUNKSIZE):
+    # cadence=None keeps every observation
     city_name = path.split('/')[-1].split('_')[0]
     timezone = get_time_zone(city_name)
-    # relocalize to the correct timezone
-    df['date_time'] = df['date_time'].dt.tz_convert(timezone)
-    df['date'] = df['date_time'].dt.date
-    df['time'] = df['date_time'].dt.time
-    df['year'] = df['date_time'].dt.year
-    df['month'] = df['date_time'].dt.month
-    df['day'] = df['date_time'].dt.day
-    df['hour'] = df['date_time'].dt.hour
-    df['minute'] = df['date_time'].dt.minute
-    df['second'] = df['date_time'].dt.second
-    df['day_of_year'] = df['date_time'].dt.dayofyear
-    # sin ad cos of the day of the year
-    df['sin_day'] = np.sin(2 * np.pi * df['day_of_year']/365)
-    df['cos_day'] = np.cos(2 * np.pi * df['day_of_year']/365)
+    columns, dtype = get_projection(path)
+    time_column = STORE_SCHEMAS["WRH"]["time_column"]
+    one_hot_column = 'wind_cardinal_direction_set_1d'
+    minutes = None if cadence is None else get_cadence_minutes(cadence)
+    # one-hot columns come from every observation, as if the whole file had been encoded before filtering
+    categories = set()
+    # csv chunks are recorded raw by the prefilter, store batches (which skip the prefilter) in the loop below
+    prefiltered = [False]
+    def record_categories(df):
+        for column in df.columns:
+            if column.lower() == one_hot_column:
+                categories.update(df[column].dropna().unique())
+    prefilter = None
+    if minutes is not None:
+        cadence_prefilter = get_cadence_prefilter(minutes, timezone, time_column)
+        def prefilter(df):
+            record_categories(df)
+            prefiltered[0] = True
+            if cadence_prefilter is None:
+                return pd.Series(True, index=df.index)
+            return cadence_prefilter(df)
+    
+    chunks = []
+    for df in iter_source(path, start=start, end=end, columns=columns, dtype=dtype, chunksize=chunksize, prefilter=prefilter):
+        if not prefiltered[0]:
+            record_categories(df)
+        prefiltered[0] = False
+        df.columns = df.columns.str.lower()
+        # relocalize to the correct timezone
+        df['date_time'] = df['date_time'].dt.tz_convert(timezone)
+        if minutes is not None:
+            df = df[on_cadence(df['date_time'], minutes)]
+        chunks.append(df)
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=[column.lower() for column in columns])
+    # store batches come in part file order
+    df = df.sort_values('date_time', kind='stable', ignore_index=True)
+    
+    if one_hot_column in df.columns:
+        df[one_hot_column] = pd.Categorical(df[one_hot_column], categories=sorted(categories))
     columns_to_one_hot = ['wind_cardinal_direction_set_1d']
     df = pd.get_dummies(df, columns=columns_to_one_hot, dtype=int)
     # fill na of one column sun_hours_set_1 with 0
@@ -111,7 +262,97 @@ def load_WRH_df(path):
     df = df.dropna()
     return df
 
-def merge_daily(noaa_df, om_df):
+# NOAA column -> Open-Meteo column used on the days NOAA is missing it
+GAP_FILL_PAIRS = [
+    ('maxtemperature', 'temperature_2m_max'),
+    ('mintemperature', 'temperature_2m_min'),
+    ('snowfall', 'snowfall_sum'),
+    ('precipitation', 'precipitation_sum'),
+]
+
+def fill_gaps(df, reference_df, pairs=GAP_FILL_PAIRS, on='date'):
+    # align the reference to df's dates once, then every pair is a column-wise coalesce
+    # (duplicate reference dates keep the last value, like the dict lookup this replaced)
+    reference = reference_df.drop_duplicates(subset=on, keep='last').set_index(on)
+    aligned = reference[[fallback for _, fallback in pairs]].reindex(df[on].to_numpy())
+    for target, fallback in pairs:
+        df[target] = df[target].fillna(pd.Series(aligned[fallback].to_numpy(), index=df.index))
+    return df
+
+def fill_gaps_rowwise(df, reference_df, pairs=GAP_FILL_PAIRS, on='date'):
+    # the original row by row version, only kept as the baseline for benchmark_gap_fill
+    def fill_missing_from_dict(row, column_name, reference_dict):
+        if pd.isna(row[column_name]):
+            return reference_dict.get(row[on], np.nan)
+        return row[column_name]
+    for target, fallback in pairs:
+        reference_dict = reference_df.set_index(on)[fallback].to_dict()
+        df[target] = df.apply(fill_missing_from_dict, args=(target, reference_dict), axis=1)
+    return df
+
+def benchmark_gap_fill(noaa_path, om_path, repeat=3):
+    # times both versions on the same data and checks they agree, e.g. on the full Chicago history
+    noaa_df = load_NOAA_df(noaa_path)
+    om_df = load_OM_df(om_path)
+    timings = {}
+    results = {}
+    for name, fill in [('rowwise', fill_gaps_rowwise), ('vectorized', fill_gaps)]:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = fill(noaa_df.copy(), om_df)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    columns = [target for target, _ in GAP_FILL_PAIRS]
+    pd.testing.assert_frame_equal(results['rowwise'][columns], results['vectorized'][columns], check_dtype=False)
+    print(f"{len(noaa_df)} rows: rowwise {timings['rowwise']:.3f}s, vectorized {timings['vectorized']:.4f}s "
+          f"({timings['rowwise'] / timings['vectorized']:.0f}x)")
+    return timings
+
+# Compact dtypes
+# Opt-in mode for load_all_dfs: measurements are kept as float32, 0/1 flags and small counters as int8/int16,
+# leftover string codes as categoricals and dates as datetime64, instead of float64/int64/object.
+# Every step keeps the dtypes it is given, so compact_frame is applied after the loaders and after the steps
+# that widen them again (groupby means, rolling means, the last row re-added in merge_daily).
+def compact_frame(df):
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object:
+            values = values.infer_objects()
+        if pd.api.types.is_float_dtype(values):
+            df[column] = values.astype('float32')
+        elif pd.api.types.is_bool_dtype(values):
+            df[column] = values
+        elif pd.api.types.is_integer_dtype(values):
+            df[column] = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            df[column] = values
+        elif pd.api.types.is_string_dtype(values) or values.dtype == object:
+            df[column] = values.astype('category')
+        else:
+            df[column] = values
+    return df
+
+def get_memory_usage(df):
+    # frames give one number per column, the predictor series a single one
+    return int(np.sum(df.memory_usage(deep=True)))
+
+def memory_report(noaa_path, om_path, ss_path, wrh_path, aq_path):
+    # MB per output of load_all_dfs with the default and the compact dtypes
+    names = ['daily_df', 'daily_df_2', 'daily_df_3', 'all_df', 'predictor_final']
+    default = load_all_dfs(noaa_path, om_path, ss_path, wrh_path, aq_path)
+    compact = load_all_dfs(noaa_path, om_path, ss_path, wrh_path, aq_path, compact=True)
+    report = pd.DataFrame({
+        'frame': names,
+        'default_mb': [get_memory_usage(df) / 1024 ** 2 for df in default],
+        'compact_mb': [get_memory_usage(df) / 1024 ** 2 for df in compact],
+    })
+    report['ratio'] = report['compact_mb'] / report['default_mb']
+    return report
+
+def merge_daily(noaa_df, om_df, compact=False):
     df = noaa_df.copy()
     
     # Cycle features
@@ -123,23 +364,10 @@ def merge_daily(noaa_df, om_df):
     df['cos_day'] = np.cos(2 * np.pi * df['day_of_year']/365)
     
     # drop atobstemp 
-    df.drop(columns=['snowdepth', 'hdd', 'hdddeparture', 'cdd', 'cdddeparture', 'gdd', 'snowfallnormal', 'snowfalldeparture'], inplace=True)
-    
-    # Fill missing values
-    max_temp_om_dict = om_df.set_index('date')['temperature_2m_max'].to_dict()
-    min_temp_om_dict = om_df.set_index('date')['temperature_2m_min'].to_dict()
-    snowfall_om_dict = om_df.set_index('date')['snowfall_sum'].to_dict()
-    precipitation_om_dict = om_df.set_index('date')['precipitation_sum'].to_dict()
+    df.drop(columns=['snowdepth', 'hdd', 'hdddeparture', 'cdd', 'cdddeparture', 'gdd', 'snowfallnormal', 'snowfalldeparture'], inplace=True, errors='ignore')
     
-    def fill_missing_from_dict(row, column_name, reference_dict):
-        if pd.isna(row[column_name]):
-            return reference_dict.get(row['date'], np.nan)
-        return row[column_name]
-
-    # Apply custom function
-    df['maxtemperature'] = df.apply(fill_missing_from_dict, args=('maxtemperature', max_temp_om_dict), axis=1)
-    df['mintemperature'] = df.apply(fill_missing_from_dict, args=('mintemperature', min_temp_om_dict), axis=1)
-    df['snowfall'] = df.apply(fill_missing_from_dict, args=('snowfall', snowfall_om_dict), axis=1)
+    # Fill missing values (max/min temperature, snowfall and precipitation) from Open-Meteo
+    df = fill_gaps(df, om_df)
     # For avgtemperature just draw from avgtemperaturenormal at the Nan values
     df['avgtemperature'] = df['avgtemperature'].fillna(df['avgtemperaturenormal'])    
     
@@ -148,8 +376,7 @@ def merge_daily(noaa_df, om_df):
     df['mintemperaturedeparture'] = df['mintemperature'] - df['mintemperaturenormal']
     df['avgtemperaturedeparture'] = df['avgtemperature'] - df['avgtemperaturenormal']
     
-    # Reverse calculate precipitation from precipitation normal and departure
-    df['precipitation'] = df.apply(fill_missing_from_dict, args=('precipitation', precipitation_om_dict), axis=1)
+    # Recalculate precipitation departure from the filled precipitation and its normal
     df['precipitationdeparture'] = df['precipitation'] - df['precipitationnormal']
     
     # look at the next day historical normals
@@ -163,18 +390,20 @@ def merge_daily(noaa_df, om_df):
     df = df.merge(om_df, on='date', how='left')
     
     # Turn weather_code into one hot encoding
-    df = pd.get_dummies(df, columns=['weather_code'], dtype=int)
+    df = pd.get_dummies(df, columns=['weather_code'], dtype=np.int8 if compact else int)
         
     # Target 
     df['next_day_max_temp'] = df['maxtemperature'].shift(-1)
     
     last_row = df.iloc[-1]
+    df_last_row = df.iloc[[-1]]
     df = df[:-1]
 
     df = df.dropna()
     
     # readd last row dont use append
-    last_row_df = pd.DataFrame(last_row).transpose()
+    # (the transposed row turns every column into object, the compact mode keeps the row as a frame instead)
+    last_row_df = df_last_row if compact else pd.DataFrame(last_row).transpose()
     df = pd.concat([df, last_row_df], ignore_index=True)
     
     # add moving averages
@@ -191,13 +420,60 @@ def merge_daily(noaa_df, om_df):
     df = df.dropna()    
     return df, last_row
 
+# Day bucketing
+# turn_daily averages the hourly rows per local calendar day. Instead of building a date column and grouping on
+# it, days are bucketed by integer division of the local wall clock time and summed with np.add.reduceat.
+# Results are the same as groupby('date').mean().
+DAY_SECONDS = 86400
+
+def daily_mean(df, on='date_time'):
+    # groupby local calendar day -> mean of every other column, with the day as a tz-naive 'date'
+    local = df[on].dt.tz_localize(None) if df[on].dt.tz is not None else df[on]
+    days = local.dt.as_unit('s').to_numpy().view('int64') // DAY_SECONDS
+    values = df.drop(columns=[on])
+    order = np.argsort(days, kind='stable')
+    days = days[order]
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) > 0 else np.array([], dtype='int64')
+    result = {'date': (days[starts] * DAY_SECONDS).astype('datetime64[s]')}
+    for column in values.columns:
+        column_values = values[column].to_numpy()[order]
+        # float32 columns (compact mode) keep their dtype, but are summed in float64 like groupby does
+        dtype = column_values.dtype if column_values.dtype.kind == 'f' else np.float64
+        column_values = column_values.astype(np.float64)
+        present = ~np.isnan(column_values)
+        # nan skipped like groupby().mean()
+        sums = np.add.reduceat(np.where(present, column_values, 0), starts) if len(starts) > 0 else np.array([], dtype=np.float64)
+        counts = np.add.reduceat(present.astype('int64'), starts) if len(starts) > 0 else np.array([], dtype='int64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[column] = (sums / counts).astype(dtype)
+    return pd.DataFrame(result)
+
+def benchmark_daily_mean(wrh_path, ss_path, repeat=3):
+    # seconds per turn_daily call, groupby vs day bucketing
+    wrh_df = add_calendar_features(load_WRH_df(wrh_path), ['minute'])
+    ss_df = load_Solar_Soil_df(ss_path)[['date_time', 'terrestrial_radiation', 'terrestrial_radiation_instant']]
+    hourly_df = pd.merge(wrh_df, ss_df, on='date_time', how='inner').drop(columns=['minute'])
+    def groupby_daily():
+        df = add_calendar_features(hourly_df, ['date']).drop(columns=['date_time'])
+        return df.groupby('date').mean().reset_index()
+    timings = {}
+    for label, function in [('groupby', groupby_daily), ('daily_mean', lambda: daily_mean(hourly_df))]:
+        elapsed = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            elapsed.append(time.perf_counter() - start)
+        timings[label] = min(elapsed)
+    return {'rows': len(hourly_df), **timings, 'speedup': timings['groupby'] / timings['daily_mean']}
+
 def merge_hourly(wrh_df, ss_df):
     # filer wrh data to only keep minute 0 entries
+    wrh_df = add_calendar_features(wrh_df, ['minute'])
     wrh_df = wrh_df[wrh_df['minute'] == 0]
     
     duplicate_columns = ['date', 'time', 'year', 'month', 'day', 'hour', 'minute', 'second', 'day_of_year', 'sin_day', 'cos_day']
     # aq_df = aq_df.drop(columns=duplicate_columns)
-    ss_df = ss_df.drop(columns=duplicate_columns)
+    ss_df = ss_df.drop(columns=duplicate_columns, errors='ignore')
 
     # clean aq
     # aq_columns = ['ammonia', 'alder_pollen', 'birch_pollen', 'grass_pollen', 'mugwort_pollen', 'olive_pollen', 'ragweed_pollen']
@@ -214,11 +490,11 @@ def merge_hourly(wrh_df, ss_df):
 
 def merge_hourly_2(hourly_df, aq_df):
     duplicate_columns = ['date', 'time', 'year', 'month', 'day', 'hour', 'minute', 'second', 'day_of_year', 'sin_day', 'cos_day']
-    aq_df = aq_df.drop(columns=duplicate_columns)
+    aq_df = aq_df.drop(columns=duplicate_columns, errors='ignore')
     
     # clean aq
     aq_columns = ['ammonia', 'alder_pollen', 'birch_pollen', 'grass_pollen', 'mugwort_pollen', 'olive_pollen', 'ragweed_pollen']
-    aq_df = aq_df.drop(columns=aq_columns)
+    aq_df = aq_df.drop(columns=aq_columns, errors='ignore')
     
     merged = pd.merge(hourly_df, aq_df, on='date_time', how='inner')
     merged = merged.dropna()
@@ -235,16 +511,17 @@ def add_target(noaa_df, merged):
     return merged
 
 def turn_daily(df):
-    columns_to_drop = ['time', 'date_time', 'hour', 'minute', 'second']
-    df = df.drop(columns=columns_to_drop)
-    df = df.groupby('date').mean().reset_index()
+    # mean per local calendar day of date_time
+    columns_to_drop = ['time', 'date', 'hour', 'minute', 'second']
+    df = df.drop(columns=columns_to_drop, errors='ignore')
+    df = daily_mean(df, on='date_time')
     return df
 
 def simple_merge(daily, daily_2):
     duplicate_columns = ['year', 'month', 'day', 'day_of_year', 'sin_day', 'cos_day']
     daily['date'] = pd.to_datetime(daily['date'])
     daily_2['date'] = pd.to_datetime(daily_2['date'])
-    daily_2 = daily_2.drop(columns=duplicate_columns)
+    daily_2 = daily_2.drop(columns=duplicate_columns, errors='ignore')
     merged = pd.merge(daily, daily_2, on='date', how='inner')
     return merged
 
@@ -253,8 +530,8 @@ def all_merge(daily_1, daily_2, daily_3):
     daily_1['date'] = pd.to_datetime(daily_1['date'])
     daily_2['date'] = pd.to_datetime(daily_2['date'])
     daily_3['date'] = pd.to_datetime(daily_3['date'])
-    daily_2 = daily_2.drop(columns=duplicate_columns)
-    daily_3 = daily_3.drop(columns=duplicate_columns)
+    daily_2 = daily_2.drop(columns=duplicate_columns, errors='ignore')
+    daily_3 = daily_3.drop(columns=duplicate_columns, errors='ignore')
     # merge without dropping na
     merged = pd.merge(daily_1, daily_2, on='date', how='left')
     # common columns between merged and daily_3
@@ -268,21 +545,318 @@ def all_merge(daily_1, daily_2, daily_3):
     merged = merged.fillna(0)
     return merged
 
-def load_all_dfs(noaa_path, om_path, ss_path, wrh_path, aq_path):
-    noaa_df = load_NOAA_df(noaa_path)
-    om_df = load_OM_df(om_path)
-    wrh_df= load_WRH_df(wrh_path)
-    aq_df = load_Air_Quality_df(aq_path)
-    ss_df = load_Solar_Soil_df(ss_path)
+def load_all_dfs(noaa_path, om_path, ss_path, wrh_path, aq_path, start=None, compact=False):
+    # start limits every source to the days from start on (see load_all_dfs_incremental)
+    noaa_df = load_NOAA_df(noaa_path, start=start)
+    om_df = load_OM_df(om_path, start=start)
+    wrh_df= load_WRH_df(wrh_path, start=start)
+    aq_df = load_Air_Quality_df(aq_path, start=start)
+    ss_df = load_Solar_Soil_df(ss_path, start=start)
+    if compact:
+        noaa_df, om_df, wrh_df, aq_df, ss_df = [compact_frame(df) for df in [noaa_df, om_df, wrh_df, aq_df, ss_df]]
 
-    daily_df, predictor = merge_daily(noaa_df, om_df)
+    daily_df, predictor = merge_daily(noaa_df, om_df, compact=compact)
+    if compact:
+        # the calendar columns and moving averages come back as int32/float64
+        daily_df = compact_frame(daily_df)
     hourly_df = merge_hourly(wrh_df, ss_df)
     hourly_df2 = merge_hourly_2(hourly_df, aq_df)
     daily_df_2 = turn_daily(hourly_df)
     daily_df_3 = turn_daily(hourly_df2)
-    predictor_final = daily_df_3.drop(columns=['date','year', 'month', 'day', 'day_of_year', 'sin_day', 'cos_day']).iloc[-1]
+    if compact:
+        # the daily means come back as float64
+        daily_df_2, daily_df_3 = compact_frame(daily_df_2), compact_frame(daily_df_3)
+    predictor_final = daily_df_3.drop(columns=['date','year', 'month', 'day', 'day_of_year', 'sin_day', 'cos_day'], errors='ignore').iloc[-1]
     predictor_final = pd.concat([predictor, predictor_final], axis=0)
     all_df = all_merge(daily_df, daily_df_2, daily_df_3)
     daily_df_2 = simple_merge(daily_df, daily_df_2)
     daily_df_3 = simple_merge(daily_df, daily_df_3)
-    return daily_df, daily_df_2, daily_df_3, all_df, predictor_final
\ No newline at end of file
+    return daily_df, daily_df_2, daily_df_3, all_df, predictor_final
+
+# Incremental feature store
+# load_all_dfs rebuilds every feature from each source's first day, but a daily run only adds a day.
+# load_all_dfs_incremental keeps the last materialized outputs per city and only recomputes a tail:
+# the raw sources are read from FEATURE_WARMUP_DAYS before the splice date (enough history for the
+# 30 day moving averages, the next-day shifts and whole local days), and every row from the splice
+# date on replaces the stored one. The last FEATURE_REFRESH_DAYS stored days are always recomputed,
+# since the newest source rows (forecast backed OM days, late WRH reports) get revised.
+FEATURE_STORE_PATH = "./features"
+FEATURE_WARMUP_DAYS = 120
+FEATURE_REFRESH_DAYS = 7
+FEATURE_OUTPUTS = ['daily_df', 'daily_df_2', 'daily_df_3', 'all_df', 'predictor_final']
+# one-hot prefixes: a category missing from the recomputed tail just means zeros
+ONE_HOT_PREFIXES = ('weather_code_', 'wind_cardinal_direction_set_1d_')
+
+def get_source_fingerprint(path):
+    # appends keep this valid, a rewritten history does not
+    city, source = parse_data_path(path)
+    if store_exists(source, city):
+        return {"parts": get_store_files(source, city)}
+    with open(path, 'rb') as f:
+        head = f.read(65536)
+    return {"head": hashlib.sha256(head).hexdigest(), "size": os.path.getsize(path)}
+
+def fingerprint_still_valid(old, new):
+    if "parts" in old:
+        return "parts" in new and set(old["parts"]) <= set(new["parts"])
+    return "head" in new and new["head"] == old["head"] and new["size"] >= old["size"]
+
+def get_feature_store_path(noaa_path, store_path=FEATURE_STORE_PATH, compact=False):
+    city, _ = parse_data_path(noaa_path)
+    return f"{store_path}/{city}_compact.pkl" if compact else f"{store_path}/{city}.pkl"
+
+def splice_frame(old_df, new_df, splice_date):
+    # old rows before splice_date followed by the recomputed rows, None if the columns no longer line up
+    extra_columns = [column for column in new_df.columns if column not in old_df.columns]
+    missing_columns = [column for column in old_df.columns if column not in new_df.columns]
+    if extra_columns or any(not column.startswith(ONE_HOT_PREFIXES) for column in missing_columns):
+        return None
+    head = old_df[old_df['date'] < splice_date]
+    tail = new_df[new_df['date'] >= splice_date].reindex(columns=old_df.columns, fill_value=0)
+    tail = tail.astype(old_df.dtypes.to_dict())
+    # keep the index a full rebuild would give: continue from the row both versions share
+    if isinstance(old_df.index, pd.RangeIndex) and len(head) > 0:
+        shared = new_df.index[new_df['date'] == head['date'].iloc[-1]]
+        if len(shared) > 0:
+            tail.index = tail.index - shared[0] + head.index[-1]
+        else:
+            tail.index = pd.RangeIndex(head.index[-1] + 1, head.index[-1] + 1 + len(tail))
+    spliced = pd.concat([head, tail])
+    if isinstance(old_df.index, pd.RangeIndex) and len(spliced) > 0 and spliced.index.is_monotonic_increasing \
+            and (np.diff(spliced.index) == 1).all():
+        spliced.index = pd.RangeIndex(spliced.index[0], spliced.index[0] + len(spliced))
+    return spliced
+
+def load_all_dfs_incremental(noaa_path, om_path, ss_path, wrh_path, aq_path, store_path=FEATURE_STORE_PATH, rebuild=False, compact=False):
+    # same outputs as load_all_dfs, but only the tail is recomputed when the stored features are still valid
+    paths = [noaa_path, om_path, ss_path, wrh_path, aq_path]
+    feature_file = get_feature_store_path(noaa_path, store_path, compact)
+    fingerprints = [get_source_fingerprint(path) for path in paths]
+    
+    stored = None
+    if not rebuild and os.path.exists(feature_file):
+        stored = pd.read_pickle(feature_file)
+        if stored.get("paths") != paths or not all(
+                fingerprint_still_valid(old, new) for old, new in zip(stored["fingerprints"], fingerprints)):
+            print(f"{feature_file}: sources were rewritten, rebuilding features")
+            stored = None
+    
+    outputs = None
+    if stored is not None:
+        old_outputs = stored["outputs"]
+        splice_date = old_outputs['all_df']['date'].max() - pd.Timedelta(days=FEATURE_REFRESH_DAYS)
+        new_outputs = dict(zip(FEATURE_OUTPUTS, load_all_dfs(*paths, start=splice_date - pd.Timedelta(days=FEATURE_WARMUP_DAYS), compact=compact)))
+        outputs = {}
+        for name in FEATURE_OUTPUTS[:-1]:
+            outputs[name] = splice_frame(old_outputs[name], new_outputs[name], splice_date)
+            if outputs[name] is None:
+                print(f"{feature_file}: {name} columns changed, rebuilding features")
+                outputs = None
+                break
+        if outputs is not None:
+            # the predictor is just the newest row, so the recomputed one is used as is
+            predictor = new_outputs['predictor_final']
+            old_predictor = old_outputs['predictor_final']
+            if any(label not in old_predictor.index for label in predictor.index):
+                outputs = None
+            else:
+                outputs['predictor_final'] = predictor.reindex(old_predictor.index, fill_value=0)
+    
+    if outputs is None:
+        outputs = dict(zip(FEATURE_OUTPUTS, load_all_dfs(*paths, compact=compact)))
+    
+    os.makedirs(store_path, exist_ok=True)
+    # write then rename so an interrupted run keeps the previous features
+    pd.to_pickle({"paths": paths, "fingerprints": fingerprints, "outputs": outputs}, feature_file + '.tmp')
+    os.replace(feature_file + '.tmp', feature_file)
+    return tuple(outputs[name] for name in FEATURE_OUTPUTS)
+
+
+# load_all_dfs cache
+# The notebooks all call load_all_dfs for the same city and rebuild identical frames after every kernel
+# restart. cached_load_all_dfs keys the five outputs on the sources (size and mtime of the csv, or of
+# every part file in the store) and on the code that builds them, and keeps them as pickles under
+# LOAD_CACHE_PATH so any process can reuse them. Hits refresh the file's mtime and the least recently
+# used entries are removed once the cache grows past LOAD_CACHE_MAX_BYTES.
+LOAD_CACHE_PATH = "./.load_cache"
+LOAD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# files whose contents decide what load_all_dfs returns (the code, and the station timezones and paths the
+# loaders parse with), a change to any of them invalidates the cache
+LOAD_CACHE_MODULES = ['df_utils.py', 'store_utils.py', 'utils.py', 'station_utils.py', 'stations.json']
+
+def get_code_version():
+    digest = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in LOAD_CACHE_MODULES:
+        with open(f"{folder}/{name}", 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def get_file_stamp(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+def get_load_cache_key(paths, compact=False, loader=None):
+    # loader: the function building the outputs, load_all_dfs and load_all_dfs_incremental get separate entries
+    loader = load_all_dfs if loader is None else loader
+    key = {"code": get_code_version(), "pandas": pd.__version__, "compact": compact,
+           "loader": f"{loader.__module__}.{loader.__qualname__}", "sources": []}
+    for path in paths:
+        city, source = parse_data_path(path)
+        if store_exists(source, city):
+            key["sources"].append([get_file_stamp(f) for f in get_store_files(source, city)])
+        else:
+            key["sources"].append(get_file_stamp(path))
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+def evict_load_cache(cache_path=LOAD_CACHE_PATH, max_bytes=LOAD_CACHE_MAX_BYTES):
+    entries = []
+    for name in os.listdir(cache_path):
+        if name.endswith('.pkl'):
+            stat = os.stat(f"{cache_path}/{name}")
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    # oldest use first, the newest entry always stays even if it is bigger than the limit
+    for _, size, name in sorted(entries)[:-1]:
+        if total <= max_bytes:
+            break
+        os.remove(f"{cache_path}/{name}")
+        total -= size
+
+def cached_load_all_dfs(noaa_path, om_path, ss_path, wrh_path, aq_path, loader=load_all_dfs, cache_path=LOAD_CACHE_PATH, compact=False):
+    paths = [noaa_path, om_path, ss_path, wrh_path, aq_path]
+    cache_file = f"{cache_path}/{get_load_cache_key(paths, compact, loader)}.pkl"
+    if os.path.exists(cache_file):
+        try:
+            outputs = pd.read_pickle(cache_file)
+            os.utime(cache_file)
+            return outputs
+        except Exception as e:
+            # a file from an older pandas or a half written one, just rebuild it
+            print(f"{cache_file}: could not be read ({e}), rebuilding")
+    outputs = loader(*paths, compact=compact)
+    os.makedirs(cache_path, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    pd.to_pickle(outputs, tmp_file, protocol=5)
+    os.replace(tmp_file, cache_file)
+    evict_load_cache(cache_path)
+    return outputs
+
+
+# Per-city loads in parallel
+# Each city's features only depend on that city's files, but pandas keeps a single core busy, so loading the
+# cities one after the other leaves the rest idle. load_all_cities runs one loader per city in a process pool.
+# Workers write their frames as Arrow IPC files under LOAD_SPILL_PATH (shared memory where there is one) and
+# only send back the file names, so the frames are never pickled through the pool. The pool is sized to the
+# cores and to the memory available right now, from a guess of what one city needs at its peak.
+LOAD_SPILL_PATH = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# peak resident bytes per byte of source, measured with load_all_dfs on 22 years of hourly csvs and on the store
+LOAD_MEMORY_FACTOR = {"csv": 3, "store": 6}
+# share of the available memory the workers may plan on, the parent keeps every city's outputs as well
+LOAD_MEMORY_SHARE = 0.7
+
+def get_available_memory():
+    # bytes that can be used without swapping, None where the platform doesn't say
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def estimate_load_memory(paths):
+    total = 0
+    for path in paths:
+        city, source = parse_data_path(path)
+        if store_exists(source, city):
+            total += sum(os.path.getsize(f) for f in get_store_files(source, city)) * LOAD_MEMORY_FACTOR["store"]
+        elif os.path.exists(path):
+            total += os.path.getsize(path) * LOAD_MEMORY_FACTOR["csv"]
+    return total
+
+def get_load_workers(paths_by_city, max_workers=None):
+    workers = min(len(paths_by_city), max_workers or get_cpu_count())
+    available = get_available_memory()
+    if available is not None and paths_by_city:
+        peak = max(estimate_load_memory(paths) for paths in paths_by_city.values())
+        workers = min(workers, int(available * LOAD_MEMORY_SHARE // max(peak, 1)))
+    return max(workers, 1)
+
+def write_ipc(df, path):
+    # a RangeIndex goes into the metadata, any other index is stored as a column
+    table = pa.Table.from_pandas(df, preserve_index=None)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+def read_ipc(path):
+    # the pandas metadata brings back the index, the column order and the dtypes
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    df = table.to_pandas()
+    # except object columns holding numbers (the NOAA columns), which arrow stores as double
+    object_columns = [column['name'] for column in table.schema.pandas_metadata['columns']
+                      if column['numpy_type'] == 'object' and column['name'] in df.columns]
+    object_columns = [column for column in object_columns if df[column].dtype != object]
+    if object_columns:
+        df[object_columns] = df[object_columns].astype(object)
+    return df
+
+def load_city_outputs(city, paths, spill_path, loader, cache, compact):
+    if cache:
+        outputs = cached_load_all_dfs(*paths, loader=loader, compact=compact)
+    else:
+        outputs = loader(*paths, compact=compact)
+    outputs = dict(zip(FEATURE_OUTPUTS, outputs))
+    files = {}
+    for name in FEATURE_OUTPUTS[:-1]:
+        files[name] = f"{spill_path}/{city}_{name}.arrow"
+        write_ipc(outputs[name], files[name])
+    # the predictor is a single row of mixed types, small enough to send back as is
+    return files, outputs['predictor_final']
+
+def load_all_cities(cities=None, loader=load_all_dfs, cache=True, compact=False, max_workers=None, spill_path=LOAD_SPILL_PATH):
+    # {city: (daily_df, daily_df_2, daily_df_3, all_df, predictor_final)}, same frames as calling the loader per city
+    city_info = get_city_info()
+    if cities is None:
+        cities = list(city_info.keys())
+    paths_by_city = {city: [city_info[city][key] for key in ['noaa', 'om', 'ss', 'wrh', 'aq']] for city in cities}
+    
+    results = {}
+    pending = {}
+    for city, paths in paths_by_city.items():
+        # a city already in the load cache is one pickle read, not worth a worker
+        if cache and os.path.exists(f"{LOAD_CACHE_PATH}/{get_load_cache_key(paths, compact, loader)}.pkl"):
+            results[city] = cached_load_all_dfs(*paths, loader=loader, compact=compact)
+        else:
+            pending[city] = paths
+    
+    workers = get_load_workers(pending, max_workers)
+    if workers == 1:
+        for city, paths in pending.items():
+            outputs = cached_load_all_dfs(*paths, loader=loader, compact=compact) if cache else loader(*paths, compact=compact)
+            results[city] = tuple(outputs)
+    elif pending:
+        print(f"Loading {len(pending)} cities with {workers} processes")
+        failures = {}
+        with tempfile.TemporaryDirectory(prefix='load_all_cities_', dir=spill_path) as spill_dir:
+            with get_process_pool(workers) as executor:
+                futures = {executor.submit(load_city_outputs, city, paths, spill_dir, loader, cache, compact): city
+                           for city, paths in pending.items()}
+                for future in as_completed(futures):
+                    city = futures[future]
+                    try:
+                        files, predictor_final = future.result()
+                    except Exception as e:
+                        failures[city] = e
+                        continue
+                    frames = [read_ipc(files[name]) for name in FEATURE_OUTPUTS[:-1]]
+                    for path in files.values():
+                        os.remove(path)
+                    results[city] = (*frames, predictor_final)
+        if failures:
+            raise RuntimeError(f"load_all_cities failed for {sorted(failures)}: {failures}")
+    return {city: results[city] for city in cities}
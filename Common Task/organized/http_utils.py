@@ -0,0 +1,234 @@
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from telemetry_utils import add_metric
+
+# Shared rate limiting for every upstream API
+# One token bucket per upstream service, shared by every thread in the process, replaces the fixed sleeps
+# between calls: requests go out immediately while there is budget and only wait when the service is
+# actually near its limit. A 429 (or Retry-After) pauses the whole service, not just the thread that hit it.
+# rate: sustained requests per second, burst: requests allowed back to back, daily: budget per UTC day
+RATE_LIMITS = {
+    # free tier: 600/minute, 5000/hour, 10000/day
+    "open-meteo": {"rate": 5000 / 3600, "burst": 600, "daily": 10000},
+    "mesowest": {"rate": 1, "burst": 5, "daily": None},
+    "acis": {"rate": 1, "burst": 5, "daily": None},
+}
+
+# Open-Meteo counts its limits per client across all of its endpoints, so those hosts share one bucket
+RATE_LIMIT_HOSTS = {
+    "archive-api.open-meteo.com": "open-meteo",
+    "api.open-meteo.com": "open-meteo",
+    "air-quality-api.open-meteo.com": "open-meteo",
+    "api.mesowest.net": "mesowest",
+    "data.rcc-acis.org": "acis",
+}
+
+# Daily budgets are shared by every process on the machine: what each service has spent per UTC day is kept in
+# RATE_BUDGET_FILE, updated under a file lock. Running out is not an error for the caller to retry: acquire raises
+# DailyBudgetExceeded, and the chunked backfills stop there and pick up from their chunk cache on the next run.
+RATE_BUDGET_FILE = "./logs/rate_budget.json"
+
+class DailyBudgetExceeded(RuntimeError):
+    def __init__(self, name, used, daily):
+        resets = (pd.Timestamp.now(tz="UTC").normalize() + pd.Timedelta(days=1)).isoformat()
+        super().__init__(f"{name}: daily request budget of {daily} used up ({used} spent), resets at {resets}")
+        self.name = name
+        self.resets = resets
+
+try:
+    import fcntl
+except ImportError:
+    # no file locking on Windows, the budget is still shared but updates can race
+    fcntl = None
+
+def spend_daily_budget(name, day, cost, daily, path=None):
+    # adds cost to name's spend for day unless that goes over daily, returns (spent, whether it was added)
+    path = RATE_BUDGET_FILE if path is None else path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        content = f.read()
+        budgets = json.loads(content) if content.strip() else {}
+        # older days are dropped, only today's spend matters
+        spent = budgets.get(name, {}).get(str(day), 0)
+        if spent + cost > daily:
+            return spent, False
+        budgets[name] = {str(day): spent + cost}
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(budgets))
+        return spent + cost, True
+
+# how many 429s in a row a single request sits through before the response is handed back
+RATE_LIMIT_RETRIES = 5
+# ceiling for the exponential backoff when the server gives no Retry-After
+MAX_BACKOFF = 300
+
+class TokenBucket:
+    def __init__(self, name, rate, burst, daily=None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.daily = daily
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # set from 429 responses, nobody sends before this
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.day = pd.Timestamp.now(tz="UTC").date()
+        self.used_today = 0
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        today = pd.Timestamp.now(tz="UTC").date()
+        if today != self.day:
+            self.day = today
+            self.used_today = 0
+
+    def acquire(self, cost=1):
+        # blocks until the request may go out, returns the seconds spent waiting
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    # a request heavier than the burst goes out once the bucket is full and leaves it in debt
+                    needed = min(cost, self.burst)
+                    if self.tokens >= needed:
+                        if self.daily is not None:
+                            # counted against what every process spent today, not just this one
+                            spent, added = spend_daily_budget(self.name, self.day, cost, self.daily)
+                            if not added:
+                                raise DailyBudgetExceeded(self.name, spent, self.daily)
+                            self.used_today = spent
+                        else:
+                            self.used_today += cost
+                        self.tokens -= cost
+                        self.waited += waited
+                        return waited
+                    wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            if retry_after is None:
+                # exponential backoff with jitter so waiting threads don't all come back at once
+                retry_after = min(2 ** self.failures, MAX_BACKOFF) * random.uniform(1, 1.5)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.tokens = 0
+
+    def reward(self):
+        with self.lock:
+            self.failures = 0
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(host):
+    name = RATE_LIMIT_HOSTS.get(host)
+    if name is None:
+        return None
+    with rate_limiters_lock:
+        if name not in rate_limiters:
+            rate_limiters[name] = TokenBucket(name, **RATE_LIMITS[name])
+        return rate_limiters[name]
+
+def get_retry_after(response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    # the header may also be an http date
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+def get_request_cost(request):
+    # Open-Meteo weighs calls: every location counts, and so does every 10 variables and every 2 weeks
+    parsed = urlparse(request.url)
+    if RATE_LIMIT_HOSTS.get(parsed.hostname) != "open-meteo":
+        return 1
+    query = parse_qs(parsed.query)
+    def count(key):
+        return sum(len(value.split(",")) for value in query.get(key, []))
+    locations = max(count("latitude"), 1)
+    variables = max(count("hourly"), count("daily"), 1)
+    if "start_date" in query:
+        days = (pd.Timestamp(query["end_date"][0]) - pd.Timestamp(query["start_date"][0])).days + 1
+    else:
+        days = int(query.get("past_days", ["0"])[0]) + int(query.get("forecast_days", ["7"])[0])
+    return locations * max(variables / 10, 1) * max(days / 14, 1)
+
+class RateLimitedAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        limiter = get_rate_limiter(urlparse(request.url).hostname)
+        if limiter is None:
+            response = super().send(request, **kwargs)
+        else:
+            cost = get_request_cost(request)
+            for attempt in range(RATE_LIMIT_RETRIES + 1):
+                add_metric("sleep_seconds", limiter.acquire(cost))
+                response = super().send(request, **kwargs)
+                if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                    break
+                limiter.penalize(get_retry_after(response))
+                add_metric("retries")
+                print(f"[{limiter.name}] 429 from {request.url.split('?')[0]}, backing off ({attempt + 1}/{RATE_LIMIT_RETRIES})")
+                response.close()
+            if response.status_code != 429:
+                limiter.reward()
+        # the body is read here instead of by the caller so its size lands in the current telemetry stage
+        add_metric("requests")
+        add_metric("bytes", len(response.content))
+        return response
+
+def get_rate_limited_session(session=None, retries=5, backoff_factor=0.2):
+    # same as retry_requests.retry, but every request also goes through the shared limiter
+    session = session or requests.Session()
+    # 429s are left to the limiter (urllib3 would otherwise sleep on Retry-After without telling anyone)
+    max_retries = Retry(total=retries, read=retries, connect=retries, backoff_factor=backoff_factor,
+                        status_forcelist=(500, 502, 504), allowed_methods=None, respect_retry_after_header=False)
+    adapter = RateLimitedAdapter(max_retries=max_retries)
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, adapter)
+    return session
+
+http_session = None
+http_session_lock = threading.Lock()
+
+def get_http_session():
+    # one shared session for the plain json APIs (ACIS, MesoWest), connections are reused between calls
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            http_session = get_rate_limited_session()
+        return http_session
+
+def get_rate_limit_report():
+    # requests spent today and seconds spent waiting, per upstream service
+    return pd.DataFrame([
+        {"service": name, "used_today": limiter.used_today, "daily_budget": limiter.daily, "seconds_waited": limiter.waited}
+        for name, limiter in rate_limiters.items()
+    ])
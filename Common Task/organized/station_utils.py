@@ -0,0 +1,128 @@
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Station registry
+# Every traded market is one row in stations.json (city, station id, elevation, coordinates, timezone,
+# Kalshi ticker). The file is read once per process and indexed by city, station id and ticker, and the
+# data/model/history paths are derived from the city name, so adding a market means adding one line there.
+# A station can override any derived path with a "paths" entry.
+STATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stations.json")
+
+STATION_PATHS = {
+    "noaa": "./data/{city}_NOAA.csv",
+    "om": "./data/{city}_OM.csv",
+    "wrh": "./data/{city}_WRH.csv",
+    "aq": "./data/{city}_Air_Quality.csv",
+    "ss": "./data/{city}_Solar_Soil.csv",
+    "attn_lstm": "./models/{city}_attn_lstm.pt",
+    "lstm": "./models/{city}_lstm.pt",
+    "xgb": "./models/{city}_xgb.pkl",
+    "scaler": "./models/{city}_scaler_features.pkl",
+    "history": "./history/{city}_history.csv",
+}
+
+STATION_FIELDS = ["city", "station", "elev", "lat", "lon", "tz", "kalshi"]
+
+class StationRegistry:
+    def __init__(self, path=STATIONS_FILE):
+        self.path = path
+        with open(path) as f:
+            stations = json.load(f)
+        # city -> info dict, in file order (the order every loop over cities uses)
+        self.info = {}
+        self.by_station = {}
+        self.by_ticker = {}
+        for station in stations:
+            missing = [field for field in STATION_FIELDS if field not in station]
+            if missing:
+                raise RuntimeError(f"{path}: station {station} is missing {missing}")
+            city = station["city"]
+            paths = {key: template.format(city=city) for key, template in STATION_PATHS.items()}
+            paths.update(station.get("paths", {}))
+            info = {key: value for key, value in station.items() if key not in ["city", "paths"]}
+            info.update(paths)
+            for index, key in [(self.info, city), (self.by_station, station["station"]), (self.by_ticker, station["kalshi"])]:
+                if key in index:
+                    raise RuntimeError(f"{path}: {key} is listed more than once")
+            self.info[city] = info
+            self.by_station[station["station"]] = city
+            self.by_ticker[station["kalshi"]] = city
+        # per-station objects that are expensive to build (models, scalers), made on first use
+        self.resources = {}
+        self.lock = threading.Lock()
+
+    def get_city(self, key):
+        # city name, station id or Kalshi ticker -> city name
+        if key in self.info:
+            return key
+        city = self.by_station.get(key) or self.by_ticker.get(key)
+        if city is None:
+            raise RuntimeError(f"unknown city, station or ticker: {key}")
+        return city
+
+    def get(self, key):
+        return self.info[self.get_city(key)]
+
+    def cities(self):
+        return list(self.info.keys())
+
+    def get_resource(self, key, name, factory, path=None):
+        # factory() runs once per station and name, later calls get the same object back
+        # path: the file the object is built from, it is built again once that file changes (e.g. after retraining)
+        resource_key = (self.get_city(key), name)
+        stamp = get_resource_stamp(path)
+        with self.lock:
+            if resource_key not in self.resources or self.resources[resource_key][0] != stamp:
+                self.resources[resource_key] = (stamp, factory())
+            return self.resources[resource_key][1]
+
+    def invalidate(self, key=None):
+        # drop one station's objects (all of them without a key), the next get_resource builds them again
+        with self.lock:
+            city = None if key is None else self.get_city(key)
+            for resource_key in list(self.resources):
+                if city is None or resource_key[0] == city:
+                    del self.resources[resource_key]
+
+def get_resource_stamp(path):
+    # what get_resource compares to tell a rewritten file, None for no file
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+station_registry = None
+station_registry_mtime = None
+station_registry_lock = threading.Lock()
+
+def get_station_registry():
+    # loaded once, and again only when stations.json changes
+    global station_registry, station_registry_mtime
+    with station_registry_lock:
+        mtime = os.path.getmtime(STATIONS_FILE)
+        if station_registry is None or mtime != station_registry_mtime:
+            station_registry = StationRegistry(STATIONS_FILE)
+            station_registry_mtime = mtime
+        return station_registry
+
+def get_city_info():
+    # city -> {"station", "elev", "lat", "lon", "tz", "kalshi", data/model/history paths}
+    # a copy, so a caller changing it can't change what everyone else gets from the registry
+    return {city: dict(info) for city, info in get_station_registry().info.items()}
+
+def get_time_zone(city):
+    return get_station_registry().get(city)["tz"]
+
+# Process pools
+# The per-city loaders (df_utils) and the per-city training (training_utils) both fan out to processes sized by
+# the cores this process may use. Workers are spawned, not forked: the notebooks have torch and its thread pools
+# loaded, which don't survive a fork.
+def get_cpu_count():
+    # cores this process may run on, which can be fewer than the machine has
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+def get_process_pool(max_workers):
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
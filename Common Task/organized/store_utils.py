@@ -0,0 +1,319 @@
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from telemetry_utils import add_metric, telemetry_stage
+
+# Partitioned columnar store
+# Every source/city pair is kept as monthly Parquet partitions:
+#   ./store/{source}/{city}/month=YYYY-MM/part-<time>-<id>.parquet
+# Updates write only the new rows as another part file, so nothing is re-read or re-written,
+# and readers filter on the time column so only the months that are needed get opened.
+# A source/city pair uses the store once it has been migrated (see migrate_csv_to_store),
+# until then the csv under ./data is used as before.
+STORE_PATH = "./store"
+
+# source -> time column, whether the time column holds calendar dates (kept tz-naive),
+# and the columns that stay strings. Every other column is stored as float64.
+STORE_SCHEMAS = {
+    "NOAA": {"time_column": "Date", "dates": True, "string_columns": []},
+    "OM": {"time_column": "date", "dates": True, "string_columns": []},
+    "WRH": {"time_column": "date_time", "dates": False, "string_columns": [
+        'wind_cardinal_direction_set_1d', 'weather_condition_set_1d', 'weather_summary_set_1d',
+        'cloud_layer_1_set_1d', 'cloud_layer_2_set_1d', 'cloud_layer_3_set_1d',
+        'metar_set_1', 'metar_origin_set_1']},
+    "Solar_Soil": {"time_column": "date", "dates": False, "string_columns": []},
+    "Air_Quality": {"time_column": "date", "dates": False, "string_columns": []},
+}
+
+def parse_data_path(path):
+    # ./data/Chicago_Solar_Soil.csv -> ("Chicago", "Solar_Soil")
+    name = os.path.splitext(os.path.basename(path))[0]
+    city, source = name.split('_', 1)
+    return city, source
+
+def get_store_path(source, city, store_path=STORE_PATH):
+    return f"{store_path}/{source}/{city}"
+
+def store_exists(source, city, store_path=STORE_PATH):
+    path = get_store_path(source, city, store_path)
+    if not os.path.isdir(path) and os.path.isdir(path + ".old"):
+        # a swap interrupted between its two renames, the previous version is still complete
+        os.replace(path + ".old", path)
+    return os.path.isdir(path)
+
+# Timestamp layouts the fetchers write, by string length:
+# 2019-01-01 / 2019-01-01 00:00:00 / 2019-01-01T00:00:00Z / 2019-01-01T00:00:00-0600 / 2019-01-01 00:00:00-06:00
+# A column in one of them goes through pd.to_datetime with an explicit format. The utc offset at the end of the
+# last two is split off first and applied per distinct value (a handful per file), because %z makes pandas
+# parse every string on its own.
+ISO_LENGTHS = [10, 19, 20, 24, 25]
+
+def get_offset_seconds(offset):
+    # +hhmm / -hh:mm -> seconds east of UTC
+    digits = offset[1:].replace(':', '')
+    if offset[0] not in '+-' or len(digits) != 4:
+        raise ValueError(f"not a utc offset: {offset}")
+    return (-1 if offset[0] == '-' else 1) * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+
+def parse_fixed_format(values):
+    # UTC times for a column of same-length strings in one of ISO_LENGTHS, None for anything else
+    # (mixed layouts, fractional seconds, missing values), which then goes through the ISO8601 parser
+    if len(values) == 0 or not (pd.api.types.is_string_dtype(values) or values.dtype == object):
+        return None
+    lengths = values.str.len()
+    if lengths.isna().any() or lengths.min() != lengths.max() or lengths.iloc[0] not in ISO_LENGTHS:
+        return None
+    width = int(lengths.iloc[0])
+    date_format = "%Y-%m-%d" if width == 10 else f"%Y-%m-%d{values.iloc[0][10]}%H:%M:%S"
+    try:
+        if width in [10, 19]:
+            return pd.to_datetime(values, utc=True, format=date_format)
+        if width == 20:
+            return pd.to_datetime(values, utc=True, format=date_format + 'Z')
+        times = pd.to_datetime(values.str.slice(0, 19), format=date_format)
+        codes, offsets = pd.factorize(values.str.slice(19))
+        seconds = np.array([get_offset_seconds(offset) for offset in offsets], dtype=np.int64)
+        return (times - pd.to_timedelta(seconds[codes], unit='s')).dt.tz_localize('UTC')
+    except ValueError:
+        return None
+
+def parse_times(values):
+    # csv files mix iso formats over time (raw MesoWest strings, pandas output), so parse them as ISO8601
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values, utc=True)
+    # most files use a single layout, which pandas parses much faster given the format
+    times = parse_fixed_format(values)
+    if times is not None:
+        return times
+    return pd.to_datetime(values, utc=True, format='ISO8601')
+
+def to_store_time(source, values):
+    # everything is stored as UTC, calendar dates are read back tz-naive
+    times = parse_times(values)
+    if STORE_SCHEMAS[source]["dates"]:
+        times = times.dt.tz_convert(None)
+    return times
+
+def apply_schema(source, df):
+    schema = STORE_SCHEMAS[source]
+    df = df.copy()
+    for column in df.columns:
+        if column == schema["time_column"]:
+            df[column] = parse_times(df[column])
+        elif column in schema["string_columns"]:
+            df[column] = df[column].astype("string")
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype("float64")
+    return df
+
+def append_to_store(source, city, df, store_path=STORE_PATH):
+    if len(df) == 0:
+        return
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    df = apply_schema(source, df)
+    path = get_store_path(source, city, store_path)
+    months = df[time_column].dt.strftime("%Y-%m")
+    # part names start with the write time so files sort in the order they were appended
+    part_name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+    for month, month_df in df.groupby(months, sort=True):
+        month_path = f"{path}/month={month}"
+        os.makedirs(month_path, exist_ok=True)
+        table = pa.Table.from_pandas(month_df, preserve_index=False)
+        pq.write_table(table, f"{month_path}/{part_name}")
+
+# Rewrites go to a sibling {city}.tmp directory that is swapped in by rename once every part is written, so a
+# crash part way through leaves the old partitions in place (a directory can't be renamed over a non-empty one,
+# so the old one steps aside to {city}.old first and store_exists puts it back if the swap was interrupted).
+def swap_store(source, city, write, store_path=STORE_PATH):
+    path = get_store_path(source, city, store_path)
+    tmp_city = f"{city}.tmp"
+    tmp_path = get_store_path(source, tmp_city, store_path)
+    # leftovers of an earlier crash: store_exists restores an interrupted swap, what remains is stale
+    store_exists(source, city, store_path)
+    for leftover in (tmp_path, path + ".old"):
+        if os.path.isdir(leftover):
+            shutil.rmtree(leftover)
+    os.makedirs(tmp_path)
+    try:
+        write(tmp_city)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    if os.path.isdir(path):
+        os.replace(path, path + ".old")
+    os.replace(tmp_path, path)
+    shutil.rmtree(path + ".old", ignore_errors=True)
+
+def replace_store(source, city, df, store_path=STORE_PATH):
+    swap_store(source, city, lambda tmp_city: append_to_store(source, tmp_city, df, store_path), store_path)
+
+def get_store_files(source, city, store_path=STORE_PATH):
+    path = get_store_path(source, city, store_path)
+    files = []
+    for month in sorted(os.listdir(path)):
+        month_path = f"{path}/{month}"
+        files += [f"{month_path}/{name}" for name in sorted(os.listdir(month_path)) if name.endswith('.parquet')]
+    return files
+
+def get_store_dataset(source, city, store_path=STORE_PATH):
+    files = get_store_files(source, city, store_path)
+    # columns can differ between parts (sensors come and go), so unify every footer's schema
+    partition_schema = pa.schema([("month", pa.string())])
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files] + [partition_schema])
+    return ds.dataset(files, schema=schema, format="parquet",
+                      partitioning=ds.partitioning(partition_schema, flavor="hive"),
+                      partition_base_dir=get_store_path(source, city, store_path))
+
+def get_store_filter(source, start=None, end=None):
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    expression = None
+    for bound, op in [(start, '>='), (end, '<=')]:
+        if bound is None:
+            continue
+        bound = pd.Timestamp(bound)
+        bound = bound.tz_localize("UTC") if bound.tzinfo is None else bound.tz_convert("UTC")
+        # the month partition key prunes whole directories, the time column uses row group statistics
+        if op == '>=':
+            condition = (ds.field("month") >= bound.strftime("%Y-%m")) & (ds.field(time_column) >= pa.scalar(bound, pa.timestamp("ns", "UTC")))
+        else:
+            condition = (ds.field("month") <= bound.strftime("%Y-%m")) & (ds.field(time_column) <= pa.scalar(bound, pa.timestamp("ns", "UTC")))
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def read_store(source, city, start=None, end=None, columns=None, store_path=STORE_PATH):
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    dataset = get_store_dataset(source, city, store_path)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "month"]
+    elif time_column not in columns:
+        columns = [time_column] + list(columns)
+    table = dataset.to_table(columns=columns, filter=get_store_filter(source, start, end))
+    df = table.to_pandas()
+    df[time_column] = to_store_time(source, df[time_column])
+    return df.sort_values(time_column, kind="stable").reset_index(drop=True)
+
+def store_last_timestamp(source, city, store_path=STORE_PATH):
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    path = get_store_path(source, city, store_path)
+    # only the newest month has to be opened
+    last_month = sorted(os.listdir(path))[-1]
+    times = pq.read_table(f"{path}/{last_month}", columns=[time_column]).column(time_column).to_pandas()
+    return to_store_time(source, times).max()
+
+def migrate_csv_to_store(path, store_path=STORE_PATH, chunksize=500000):
+    city, source = parse_data_path(path)
+    def write(tmp_city):
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            append_to_store(source, tmp_city, chunk, store_path)
+    swap_store(source, city, write, store_path)
+
+# Source readers/writers
+# Loaders and update functions go through these so they work the same with or without the store.
+def get_source_columns(path):
+    # column names without reading any rows (csv header or the store's footers)
+    city, source = parse_data_path(path)
+    if store_exists(source, city):
+        return [name for name in get_store_dataset(source, city).schema.names if name != "month"]
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def read_source(path, start=None, end=None, columns=None, dtype=None):
+    # dtype only applies to the csv, the store is typed already
+    city, source = parse_data_path(path)
+    if store_exists(source, city):
+        return read_store(source, city, start=start, end=end, columns=columns)
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    if columns is not None and time_column not in columns:
+        columns = [time_column] + list(columns)
+    df = pd.read_csv(path, usecols=columns, dtype=dtype)
+    if start is not None and pd.api.types.is_string_dtype(df[time_column]):
+        # iso strings sort like the times they hold, so rows more than a day (any utc offset) before start
+        # are dropped by comparing the date prefix, and only the rest is parsed
+        prefix = (pd.Timestamp(start) - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        df = df[df[time_column].str.slice(0, 10) >= prefix]
+    if start is not None or end is not None:
+        times = to_store_time(source, df[time_column])
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= times >= to_store_time(source, pd.Series([start])).iloc[0]
+        if end is not None:
+            mask &= times <= to_store_time(source, pd.Series([end])).iloc[0]
+        df = df[mask].copy()
+        df[time_column] = times[mask]
+    return df
+
+def iter_source(path, start=None, end=None, columns=None, dtype=None, chunksize=500000, prefilter=None):
+    # read_source in chunks of at most chunksize rows, each with the time column parsed, for sources too big to
+    # hold raw. prefilter(raw csv chunk) -> boolean mask drops rows before their times are parsed.
+    city, source = parse_data_path(path)
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    if store_exists(source, city):
+        dataset = get_store_dataset(source, city)
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name != "month"]
+        elif time_column not in columns:
+            columns = [time_column] + list(columns)
+        for batch in dataset.to_batches(columns=columns, filter=get_store_filter(source, start, end), batch_size=chunksize):
+            if batch.num_rows == 0:
+                continue
+            df = batch.to_pandas()
+            df[time_column] = to_store_time(source, df[time_column])
+            yield df
+        return
+    if columns is not None and time_column not in columns:
+        columns = [time_column] + list(columns)
+    bounds = [None if bound is None else to_store_time(source, pd.Series([bound])).iloc[0] for bound in (start, end)]
+    for df in pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunksize):
+        if start is not None:
+            # same date prefix check as read_source
+            prefix = (pd.Timestamp(start) - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+            df = df[df[time_column].str.slice(0, 10) >= prefix]
+        if prefilter is not None:
+            df = df[prefilter(df).to_numpy()]
+        if len(df) == 0:
+            continue
+        df = df.copy()
+        df[time_column] = to_store_time(source, df[time_column])
+        if bounds[0] is not None:
+            df = df[df[time_column] >= bounds[0]]
+        if bounds[1] is not None:
+            df = df[df[time_column] <= bounds[1]]
+        yield df
+
+def get_last_time(path):
+    city, source = parse_data_path(path)
+    if store_exists(source, city):
+        return store_last_timestamp(source, city)
+    time_column = STORE_SCHEMAS[source]["time_column"]
+    times = pd.read_csv(path, usecols=[time_column])[time_column]
+    return to_store_time(source, times).max()
+
+def append_source(path, new_df):
+    city, source = parse_data_path(path)
+    with telemetry_stage("write", source=source, cities=city):
+        add_metric("rows", len(new_df))
+        if store_exists(source, city):
+            append_to_store(source, city, new_df)
+            return
+        # append to the csv instead of re-writing it, keeping the existing column order
+        header = pd.read_csv(path, nrows=0).columns
+        dropped = [column for column in new_df.columns if column not in header]
+        if dropped:
+            print(f"{path}: dropping columns missing from the csv header: {dropped}")
+        new_df.reindex(columns=header).to_csv(path, mode='a', header=False, index=False)
+
+def write_source(path, df):
+    city, source = parse_data_path(path)
+    with telemetry_stage("write", source=source, cities=city):
+        add_metric("rows", len(df))
+        if store_exists(source, city):
+            replace_store(source, city, df)
+        else:
+            df.to_csv(path, index=False)
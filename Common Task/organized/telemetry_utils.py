@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Ingestion telemetry
+# Every fetch/parse/write stage is timed and appended as one json line to TELEMETRY_LOG:
+#   {"run_id", "source", "cities", "stage", "started", "seconds", "ok", "error", "bytes", "rows", "requests", ...}
+# Stages nest per thread: counters recorded inside a stage (bytes from the http adapter, rows from the writers,
+# retries and sleeps) roll up into the enclosing stage, and fields like source/cities are inherited from it.
+TELEMETRY_LOG = "./logs/ingestion.jsonl"
+
+# counters every record carries, so the log can be summed without checking for missing keys
+TELEMETRY_COUNTERS = ["bytes", "rows", "requests", "retries", "sleep_seconds"]
+
+telemetry_state = threading.local()
+telemetry_lock = threading.Lock()
+telemetry_run_id = None
+
+def new_run_id():
+    # one id per ingestion run, every record written afterwards carries it
+    global telemetry_run_id
+    telemetry_run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    return telemetry_run_id
+
+def get_stage_stack():
+    if not hasattr(telemetry_state, "stack"):
+        telemetry_state.stack = []
+    return telemetry_state.stack
+
+def get_stage_fields():
+    # innermost source/cities, so helpers deep down don't need to be told which task they belong to
+    stack = get_stage_stack()
+    return dict(stack[-1]["fields"]) if stack else {}
+
+def write_record(record, path=None):
+    path = TELEMETRY_LOG if path is None else path
+    line = json.dumps(record, default=str)
+    with telemetry_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+@contextmanager
+def telemetry_stage(name, **fields):
+    stack = get_stage_stack()
+    inherited = get_stage_fields()
+    inherited.update(fields)
+    current = {"fields": inherited, "counters": dict.fromkeys(TELEMETRY_COUNTERS, 0)}
+    stack.append(current)
+    started = time.time()
+    error = None
+    try:
+        yield current["counters"]
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        stack.pop()
+        if stack:
+            for key, value in current["counters"].items():
+                stack[-1]["counters"][key] = stack[-1]["counters"].get(key, 0) + value
+        write_record({
+            "run_id": telemetry_run_id,
+            "stage": name,
+            **current["fields"],
+            "started": pd.Timestamp(started, unit="s", tz="UTC").isoformat(),
+            "seconds": round(time.time() - started, 4),
+            "ok": error is None,
+            "error": error,
+            **current["counters"],
+        })
+
+def add_metric(key, value=1):
+    # add to the innermost open stage on this thread, a no-op outside of any stage
+    stack = get_stage_stack()
+    if stack:
+        counters = stack[-1]["counters"]
+        counters[key] = counters.get(key, 0) + value
+
+def timed_sleep(seconds):
+    # time.sleep that shows up as sleep_seconds in the enclosing stage
+    add_metric("sleep_seconds", seconds)
+    time.sleep(seconds)
+
+def load_telemetry(path=None):
+    path = TELEMETRY_LOG if path is None else path
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
+
+def summarize_telemetry(run_id=None, path=None):
+    # per source and stage totals for one run (the latest by default)
+    df = load_telemetry(path)
+    if df.empty:
+        return df
+    if run_id is None:
+        run_id = df["run_id"].dropna().iloc[-1]
+    df = df[df["run_id"] == run_id]
+    # task records already include their children, so only leaf stages are summed here
+    df = df[df["stage"] != "task"]
+    summary = df.groupby(["source", "stage"], dropna=False).agg(
+        calls=("seconds", "size"),
+        seconds=("seconds", "sum"),
+        max_seconds=("seconds", "max"),
+        failed=("ok", lambda ok: int((~ok.astype(bool)).sum())),
+        **{key: (key, "sum") for key in TELEMETRY_COUNTERS},
+    )
+    return summary.reset_index()
+
+def telemetry_history(path=None):
+    # wall time per run and source from the task records, for spotting regressions across days
+    df = load_telemetry(path)
+    if df.empty:
+        return df
+    tasks = df[df["stage"] == "task"]
+    history = tasks.groupby(["run_id", "source"]).agg(
+        started=("started", "min"),
+        seconds=("seconds", "max"),
+        retries=("retries", "sum"),
+        bytes=("bytes", "sum"),
+        rows=("rows", "sum"),
+    )
+    return history.reset_index().sort_values(["started", "source"])
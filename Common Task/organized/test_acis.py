@@ -0,0 +1,75 @@
+# ACIS client against a local stand-in for data.rcc-acis.org: a MultiStnData response for two stations goes in,
+# the per-station frames (and the NOAA csv files load_NOAA_data writes from them) come out.
+# Run from this folder: python -m pytest -q test_acis.py
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+utils = pytest.importorskip("utils")
+
+N_ELEMENTS = len(utils.ACIS_DAILY_ELEMENTS)
+
+class StandInACIS(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        params = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StandInACIS.requests.append((self.path, params))
+        dates = utils.pd.date_range(params["sdate"], params["edate"], freq="D")
+        data = []
+        for i, sid in enumerate(params["sids"].split(",")):
+            # the first day is missing everywhere, the rest mix numbers with the M/T/S/A sentinels
+            rows = [["M"] * N_ELEMENTS]
+            for day in range(1, len(dates)):
+                rows.append([str(day + i), "T", "1.20A"] + ["S", "", "A", str(i)] * ((N_ELEMENTS - 3) // 4)
+                            + ["M"] * ((N_ELEMENTS - 3) % 4))
+            data.append({"meta": {"sids": [f"{sid} 5", f"1481{i} 1"]}, "data": rows})
+        body = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def acis_url():
+    StandInACIS.requests = []
+    server = HTTPServer(("127.0.0.1", 0), StandInACIS)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_acis_daily(acis_url, tmp_path, monkeypatch):
+    # telemetry writes ./logs, keep it out of the source tree
+    monkeypatch.chdir(tmp_path)
+    frames = utils.fetch_acis_daily(["KMDW", "KNYC"], "2024-01-01", "2024-01-04", base_url=acis_url)
+    path, params = StandInACIS.requests[0]
+    assert path == "/MultiStnData" and params["sids"] == "KMDW,KNYC" and len(params["elems"]) == N_ELEMENTS
+    assert list(frames) == ["KMDW", "KNYC"]
+    df = frames["KNYC"]
+    assert list(df.columns) == ["Date"] + [name for name, _ in utils.ACIS_DAILY_ELEMENTS]
+    assert list(df["Date"]) == list(utils.pd.date_range("2024-01-01", "2024-01-04", freq="D"))
+    assert (df.dtypes.iloc[1:] == "float64").all()
+    assert df.iloc[0, 1:].isna().all()
+    assert df["MaxTemperature"].tolist()[1:] == [2.0, 3.0, 4.0]
+    # trace and flagged values are NaN, not errors
+    assert df["MaxTemperatureNormal"].iloc[1:].isna().all() and df["MaxTemperatureDeparture"].iloc[1:].isna().all()
+
+def test_load_NOAA_data(acis_url, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    utils.load_NOAA_data(cities=["Chicago", "NYC"], base_url=acis_url)
+    assert StandInACIS.requests[0][1]["sdate"] == utils.ACIS_POR_START
+    chicago = utils.pd.read_csv("data/Chicago_NOAA.csv")
+    # the all-missing first day is trimmed off
+    assert chicago["Date"].iloc[0] == "1869-01-02"
+    assert chicago["MaxTemperature"].iloc[0] == 1.0
+    assert os.path.exists("data/NYC_NOAA.csv")
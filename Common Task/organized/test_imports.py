@@ -0,0 +1,18 @@
+# Import smoke check: every module has to import cleanly (default arguments, constants and class bodies all run
+# at import time). A module whose third-party dependency isn't installed is skipped, not failed.
+# Run from this folder: python -m pytest -q test_imports.py
+import importlib
+
+import pytest
+
+MODULES = ["station_utils", "telemetry_utils", "http_utils", "store_utils", "utils", "df_utils", "kalshi_utils",
+           "training_utils"]
+
+@pytest.mark.parametrize("name", MODULES)
+def test_import(name):
+    try:
+        importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        if e.name.split('.')[0] in MODULES:
+            raise
+        pytest.skip(f"{name} needs {e.name}, which isn't installed")
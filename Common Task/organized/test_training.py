@@ -0,0 +1,56 @@
+# Compiled models against eager mode: same outputs and same parameter gradients on the same batch, for the
+# LSTM and the attention LSTM, through tracing and through torch.compile (skipped where no compiler works).
+# Run from this folder: python -m pytest -q test_training.py
+import pytest
+
+torch = pytest.importorskip("torch")
+training_utils = pytest.importorskip("training_utils")
+
+ATOL = 1e-5
+RTOL = 1e-4
+
+def get_eval_model(model_type, input_size=12, hidden_size=16):
+    torch.manual_seed(0)
+    if model_type == 'lstm':
+        model = training_utils.LSTMModel(input_size, hidden_size, 1, 1)
+    else:
+        model = training_utils.AttentionLSTMModel(input_size, hidden_size, 1, 1)
+    # dropout off, so both paths compute the same thing
+    return model.eval()
+
+def run_step(model, m, x):
+    model.zero_grad()
+    out = m(x)
+    out.sum().backward()
+    return out.detach(), [p.grad.clone() for p in model.parameters()]
+
+@pytest.mark.parametrize("model_type", ['lstm', 'attn_lstm'])
+@pytest.mark.parametrize("backend", ['trace', 'compile'])
+def test_compiled_matches_eager(model_type, backend):
+    model = get_eval_model(model_type)
+    x = torch.randn(8, training_utils.SEQ_LENGTH, 12)
+    try:
+        compiled = training_utils.compile_with_backend(model, x, backend)
+    except Exception as e:
+        if backend == 'compile':
+            pytest.skip(f"torch.compile unavailable here ({type(e).__name__})")
+        raise
+    eager_out, eager_grads = run_step(model, model, x)
+    compiled_out, compiled_grads = run_step(model, compiled, x)
+    assert torch.allclose(eager_out, compiled_out, atol=ATOL, rtol=RTOL)
+    assert len(eager_grads) == len(compiled_grads)
+    for eager_grad, compiled_grad in zip(eager_grads, compiled_grads):
+        assert torch.allclose(eager_grad, compiled_grad, atol=ATOL, rtol=RTOL)
+    # and on a batch it wasn't compiled on
+    x_new = torch.randn(8, training_utils.SEQ_LENGTH, 12)
+    with torch.no_grad():
+        assert torch.allclose(model(x_new), compiled(x_new), atol=ATOL, rtol=RTOL)
+
+@pytest.mark.parametrize("model_type", ['lstm', 'attn_lstm'])
+def test_compile_model_check(model_type):
+    # the check train_model runs before training on a compiled model
+    model = get_eval_model(model_type).train()
+    x = torch.randn(8, training_utils.SEQ_LENGTH, 12)
+    # raises RuntimeError when the two differ
+    training_utils.compile_model(model, x, backend='trace', check=True)
+    assert model.training
@@ -9,7 +9,17 @@ import numpy as np
 from typing import Optional, Tuple
 import torch.nn.functional as F
 from torch.optim.lr_scheduler import ReduceLROnPlateau
+from torch.utils.data import DataLoader, Dataset, TensorDataset
+import hashlib
 import joblib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import as_completed
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from station_utils import get_city_info, get_cpu_count, get_process_pool, get_station_registry
 
 # Define the LSTM model
 class LSTMModel(nn.Module):
@@ -26,9 +36,8 @@ class LSTMModel(nn.Module):
         self.layer_norm2 = nn.LayerNorm(128)
 
     def forward(self, x):
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        out, _ = self.lstm(x, (h0, c0))
+        # no h0/c0 passed, nn.LSTM builds the zero states itself
+        out, _ = self.lstm(x)
         out = self.dropout1(out[:, -1, :])
         out = self.layer_norm1(out)
         out = torch.relu(self.fc1(out))
@@ -46,9 +55,7 @@ class SimpleLSTMModel(nn.Module):
         self.fc = nn.Linear(hidden_size, output_size)
 
     def forward(self, x):
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        out, _ = self.lstm(x, (h0, c0))
+        out, _ = self.lstm(x)
         out = self.fc(out[:, -1, :])
         return out
     
@@ -104,9 +111,7 @@ class AttentionLSTMModel(nn.Module):
         self.layer_norm3 = nn.LayerNorm(64)
 
     def forward(self, x, mask=None):
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
-        out, (h_n, c_n) = self.lstm(x, (h0, c0))
+        out, (h_n, c_n) = self.lstm(x)
         
         # Apply attention to LSTM output
         query = out[:, -1, :].unsqueeze(1)  # Use the last hidden state of each time step as the query
@@ -131,28 +136,179 @@ class AttentionLSTMModel(nn.Module):
         out = self.fc3(out)
         return out
 
-def train_model(model, X_train, y_train, X_val, y_val, l2_lambda=0.1, epochs = 20, lr=  0.001):
+# Sliding window sequences
+# A sample is seq_length consecutive days of scaled features, labelled with the target of the day right after.
+# SequenceDataset keeps the features as one contiguous float32 matrix and every window is a strided view into
+# it (Tensor.unfold), so the N x seq_length x F stack is never materialized. X and y are views as well.
+SEQ_LENGTH = 20  # Number of previous days to use as input
+
+class SequenceDataset(torch.utils.data.Dataset):
+    def __init__(self, features, target, seq_length=SEQ_LENGTH):
+        self.features = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32))
+        self.target = torch.from_numpy(np.ascontiguousarray(target, dtype=np.float32))
+        self.seq_length = seq_length
+        if len(self.features) <= seq_length:
+            # too short for a single labelled window (unfold would raise when shorter than one window)
+            self.X = self.features.new_zeros((0, seq_length, self.features.shape[1]))
+            self.y = self.target[:0]
+        else:
+            # (N - seq_length + 1, seq_length, F), window i covers days i .. i + seq_length - 1
+            windows = self.features.unfold(0, seq_length, 1).transpose(1, 2)
+            # the last window has no next day to label it, so it isn't a sample
+            self.X = windows[:len(self.features) - seq_length]
+            self.y = self.target[seq_length:]
+
+    def __len__(self):
+        return len(self.X)
+
+    def __getitem__(self, i):
+        return self.X[i], self.y[i]
+
+# Training data pipeline
+# train_model takes tensors (as prep_data returns them), a Dataset such as SequenceDataset, or a DataLoader.
+# Batches come from a DataLoader, optionally shuffled and prefetched by worker processes, and validation runs
+# in batches too, so neither side needs its whole split as one tensor. Each epoch reports samples/sec.
+TRAIN_BATCH_SIZE = 32
+VAL_BATCH_SIZE = 1024
+
+def set_training_threads(num_threads=None, num_workers=0):
+    # intra-op threads get the cores the loader workers don't use, inter-op work stays small for these models
+    num_threads = num_threads or max(get_cpu_count() - num_workers, 1)
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(min(num_threads, 2))
+    except RuntimeError:
+        # only settable before the first parallel op in the process
+        pass
+    return num_threads
+
+def init_loader_worker(worker_id):
+    # a worker only slices and stacks windows, it must not compete with the training threads
+    torch.set_num_threads(1)
+
+def get_loader(X, y=None, batch_size=TRAIN_BATCH_SIZE, shuffle=False, num_workers=0):
+    if isinstance(X, DataLoader):
+        return X
+    dataset = X if isinstance(X, Dataset) else TensorDataset(X, y)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      pin_memory=torch.cuda.is_available(), worker_init_fn=init_loader_worker if num_workers > 0 else None,
+                      persistent_workers=num_workers > 0, prefetch_factor=2 if num_workers > 0 else None)
+
+def evaluate_loss(model, loader, criterion):
+    # mean loss over every sample, in batches
+    was_training = model.training
+    model.eval()
+    total = 0.0
+    count = 0
+    with torch.no_grad():
+        for inputs, targets in loader:
+            outputs = model(inputs)
+            total += criterion(outputs, targets.view(-1, 1)).item() * len(targets)
+            count += len(targets)
+    model.train(was_training)
+    return total / max(count, 1)
+
+# Early stopping, checkpoints and the metrics log
+# Training stops once the validation loss hasn't improved for `patience` epochs, and the weights from the best
+# epoch are put back at the end. With a checkpoint_path, the model, optimizer and scheduler state, the epoch and
+# the early stopping state are written there every checkpoint_every epochs (write then rename, so a run killed
+# mid-write keeps the previous one), and resume=True continues from it. Every epoch is appended as one json
+# line to TRAINING_LOG instead of being plotted, plot_training_metrics draws a run from it.
+TRAINING_LOG = "./logs/training.jsonl"
+
+def save_checkpoint(path, state):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    torch.save(state, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def log_training_metrics(record, path=None):
+    path = TRAINING_LOG if path is None else path
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+def load_training_metrics(run_id=None, path=None):
+    # epochs of one training run, the latest by default
+    path = TRAINING_LOG if path is None else path
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    df = pd.read_json(path, lines=True)
+    if run_id is None:
+        run_id = df['run_id'].iloc[-1]
+    return df[df['run_id'] == run_id].reset_index(drop=True)
+
+def plot_training_metrics(run_id=None, path=None):
+    df = load_training_metrics(run_id, path)
+    plt.figure(figsize=(10, 6))
+    plt.plot(df['epoch'], df['train_loss'], label='Training Loss')
+    plt.plot(df['epoch'], df['val_loss'], label='Validation Loss')
+    plt.xlabel('Epoch')
+    plt.ylabel('Loss')
+    plt.legend()
+    plt.show()
+
+def train_model(model, X_train, y_train, X_val, y_val, l2_lambda=0.1, epochs = 20, lr=  0.001,
+                batch_size=TRAIN_BATCH_SIZE, shuffle=False, num_workers=0, num_threads=None, compile_graph=False,
+                patience=None, restore_best=True, checkpoint_path=None, checkpoint_every=1, resume=False,
+                metrics_path=None, name=None, checkpoint_key=None):
+    # X_train / X_val may also be Datasets or DataLoaders, y_train / y_val are ignored then
+    # compile_graph: run the training steps through compile_model, validation stays eager
+    # patience: epochs without a better validation loss before stopping, None trains for every epoch
+    # name: stored with every metrics record (e.g. the city) to tell runs apart in the log
+    # checkpoint_key: what the run trains on (feature columns, scaler), a checkpoint saved under another key
+    # belongs to different data and is discarded instead of resumed
     criterion = nn.MSELoss()
     optimizer = torch.optim.AdamW(model.parameters(), lr=lr)
     scheduler = ReduceLROnPlateau(optimizer, mode='min', factor=0.1, patience=5, verbose=True)
-
+    set_training_threads(num_threads, num_workers)
+    train_loader = get_loader(X_train, y_train, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers)
+    val_loader = get_loader(X_val, y_val, batch_size=VAL_BATCH_SIZE)
 
     # Train the model
     num_epochs = epochs
-    batch_size = 32
-    loss_history = []
-    val_loss_history = []
+    start_epoch = 0
+    best_val_loss = float('inf')
+    best_state = None
+    bad_epochs = 0
+    run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    checkpoint = None
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path)
+        if checkpoint.get('key') != checkpoint_key:
+            print(f"{checkpoint_path} was saved for different data, starting over")
+            checkpoint = None
+    if checkpoint is not None:
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        scheduler.load_state_dict(checkpoint['scheduler'])
+        start_epoch = checkpoint['epoch'] + 1
+        best_val_loss = checkpoint['best_val_loss']
+        best_state = checkpoint['best_state']
+        bad_epochs = checkpoint['bad_epochs']
+        # the resumed epochs are logged under the original run
+        run_id = checkpoint['run_id']
+        print(f"Resuming from {checkpoint_path} at epoch {start_epoch + 1}")
+    
+    model.train()
+    step_model = compile_model(model, next(iter(train_loader))[0], check=True) if compile_graph else model
 
-    for epoch in range(num_epochs):
+    for epoch in range(start_epoch, num_epochs):
+        if patience is not None and bad_epochs >= patience:
+            # a run resumed after it had already stopped
+            break
         epoch_loss = 0.0
         num_batches = 0
+        num_samples = 0
+        started = time.perf_counter()
+        model.train()
         
-        for i in range(0, len(X_train), batch_size):
-            inputs = X_train[i:i+batch_size]
-            targets = y_train[i:i+batch_size]
-            
+        for inputs, targets in train_loader:
             optimizer.zero_grad()
-            outputs = model(inputs)
+            outputs = step_model(inputs)
             loss = criterion(outputs, targets.view(-1, 1))
             
             l2_reg = torch.tensor(0.)
@@ -162,33 +318,149 @@ def train_model(model, X_train, y_train, X_val, y_val, l2_lambda=0.1, epochs = 2
             
             epoch_loss += loss.item()
             num_batches += 1
+            num_samples += len(targets)
             
             loss.backward()
             optimizer.step()
+        seconds = time.perf_counter() - started
         
         # Calculate average training loss for the epoch
         avg_epoch_loss = epoch_loss / num_batches
-        loss_history.append(avg_epoch_loss)
         
         # Evaluate the model on the validation set
-        with torch.no_grad():
-            val_outputs = model(X_val)
-            val_loss = criterion(val_outputs, y_val.view(-1, 1))
-            val_loss_history.append(val_loss.item())
-            
+        val_loss = evaluate_loss(model, val_loader, criterion)
         scheduler.step(val_loss)
         
-        print(f'Epoch [{epoch+1}/{num_epochs}], Train Loss: {avg_epoch_loss:.4f}, Val Loss: {val_loss.item():.4f}')
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            best_state = {key: value.detach().clone() for key, value in model.state_dict().items()}
+            bad_epochs = 0
+        else:
+            bad_epochs += 1
         
-    plt.figure(figsize=(10, 6))
-    plt.plot(range(1, num_epochs+1), loss_history, label='Training Loss')
-    plt.plot(range(1, num_epochs+1), val_loss_history, label='Validation Loss')
-    plt.xlabel('Epoch')
-    plt.ylabel('Loss')
-    plt.legend()
-    plt.show()
+        print(f'Epoch [{epoch+1}/{num_epochs}], Train Loss: {avg_epoch_loss:.4f}, Val Loss: {val_loss:.4f}, {num_samples / seconds:.0f} samples/s')
+        log_training_metrics({
+            "run_id": run_id,
+            "name": name,
+            "epoch": epoch + 1,
+            "train_loss": avg_epoch_loss,
+            "val_loss": val_loss,
+            "best_val_loss": best_val_loss,
+            "lr": optimizer.param_groups[0]['lr'],
+            "samples_per_second": num_samples / seconds,
+            "seconds": seconds,
+        }, metrics_path)
+        
+        stop = patience is not None and bad_epochs >= patience
+        if checkpoint_path is not None and ((epoch + 1) % checkpoint_every == 0 or stop or epoch + 1 == num_epochs):
+            save_checkpoint(checkpoint_path, {
+                "run_id": run_id,
+                "key": checkpoint_key,
+                "epoch": epoch,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "best_val_loss": best_val_loss,
+                "best_state": best_state,
+                "bad_epochs": bad_epochs,
+            })
+        if stop:
+            print(f'Early stopping: no improvement in {patience} epochs, best Val Loss: {best_val_loss:.4f}')
+            break
+    
+    if restore_best and best_state is not None:
+        model.load_state_dict(best_state)
     return model
 
+# Compiled models
+# Opt-in fast path for training and inference: torch.compile where it works, otherwise a TorchScript trace.
+# The compiled module shares its parameters with the eager one, so the optimizer, state_dict and saving keep
+# using the eager model. A trace records the mode it was traced in (dropout on or off), so trace for training
+# with the model in train mode and for inference in eval mode. check_compiled_model compares both paths (every
+# compile_model call with check=True does, train_model's included) and benchmark_compiled_models times them.
+def compile_model(model, example_input, backend=None, check=False):
+    # backend: 'compile', 'trace', or None for torch.compile with tracing as the fallback
+    # check: compare against the eager model before handing the compiled one out
+    compiled = compile_with_backend(model, example_input, backend)
+    if check:
+        # a trace made in train mode has dropout baked in, that case is checked on a separate eval mode compile
+        check_compiled_model(model, example_input, compiled=None if model.training else compiled, backend=backend)
+    return compiled
+
+def compile_with_backend(model, example_input, backend=None):
+    if backend in (None, 'compile') and hasattr(torch, 'compile'):
+        try:
+            compiled = torch.compile(model)
+            # compile now, so a missing compiler shows up here and not in the middle of training
+            with torch.no_grad():
+                compiled(example_input)
+            return compiled
+        except Exception as e:
+            if backend == 'compile':
+                raise
+            print(f"torch.compile failed ({type(e).__name__}: {e}), tracing instead")
+    # dropout makes the trace check fail in train mode, equivalence is checked by check_compiled_model
+    return torch.jit.trace(model, example_input, check_trace=False)
+
+def check_compiled_model(model, example_input, compiled=None, backend=None, atol=1e-5, rtol=1e-4):
+    # outputs and parameter gradients of the eager and compiled model on the same batch, in eval mode
+    # compiled: an eval mode compiled module to check, compiled here when not given
+    was_training = model.training
+    model.eval()
+    if compiled is None:
+        compiled = compile_with_backend(model, example_input, backend)
+    results = {}
+    gradients = {}
+    for name, m in [('eager', model), ('compiled', compiled)]:
+        model.zero_grad()
+        out = m(example_input)
+        out.sum().backward()
+        results[name] = out.detach()
+        gradients[name] = [p.grad.clone() for p in model.parameters() if p.grad is not None]
+    model.zero_grad()
+    model.train(was_training)
+    output_diff = (results['eager'] - results['compiled']).abs().max().item()
+    gradient_diff = max(((a - b).abs().max().item() for a, b in zip(gradients['eager'], gradients['compiled'])), default=0.0)
+    if not torch.allclose(results['eager'], results['compiled'], atol=atol, rtol=rtol) or \
+            len(gradients['eager']) != len(gradients['compiled']) or \
+            not all(torch.allclose(a, b, atol=atol, rtol=rtol) for a, b in zip(gradients['eager'], gradients['compiled'])):
+        raise RuntimeError(f"compiled {type(model).__name__} differs from eager: output {output_diff:.2e}, gradients {gradient_diff:.2e}")
+    return {"output_diff": output_diff, "gradient_diff": gradient_diff}
+
+def benchmark_compiled_models(model_types=('lstm', 'attn_lstm'), batch_sizes=(32, 256, 1024), hidden_sizes=(32, 64, 128),
+                              input_size=100, seq_length=SEQ_LENGTH, repeat=10, backend=None):
+    # forward (no grad) and forward + backward samples/s on the CPU, eager vs compiled
+    criterion = nn.MSELoss()
+    rows = []
+    for model_type in model_types:
+        for hidden_size in hidden_sizes:
+            for batch_size in batch_sizes:
+                x = torch.randn(batch_size, seq_length, input_size)
+                y = torch.randn(batch_size, 1)
+                model = get_model(x, y, hidden_size=hidden_size, model_type=model_type)
+                model.train()
+                compiled = compile_model(model, x, backend)
+                for mode, m in [('eager', model), ('compiled', compiled)]:
+                    row = {"model": model_type, "hidden_size": hidden_size, "batch_size": batch_size, "mode": mode}
+                    # one untimed call each first, the compiled model may still specialize on it
+                    with torch.no_grad():
+                        m(x)
+                        started = time.perf_counter()
+                        for _ in range(repeat):
+                            m(x)
+                    row["forward_samples_s"] = batch_size * repeat / (time.perf_counter() - started)
+                    criterion(m(x), y).backward()
+                    started = time.perf_counter()
+                    for _ in range(repeat):
+                        model.zero_grad()
+                        criterion(m(x), y).backward()
+                    row["train_samples_s"] = batch_size * repeat / (time.perf_counter() - started)
+                    rows.append(row)
+    df = pd.DataFrame(rows)
+    speedup = df.pivot_table(index=["model", "hidden_size", "batch_size"], columns="mode", values="train_samples_s")
+    print((speedup["compiled"] / speedup["eager"]).rename("train_speedup").to_string())
+    return df
+
 def get_model(X_train, y_train, dropout_rate=0.2, hidden_size=64, num_layers=1, model_type='lstm'):
     input_size = X_train.shape[2]
     hidden_size = hidden_size
@@ -308,7 +580,7 @@ def weight_transfer(model2, model):
     
     return model2
 
-def prep_data(data, columns_to_ignore, target_column):
+def prep_data(data, columns_to_ignore, target_column, seq_length=SEQ_LENGTH):
     # Prepare the data for LSTM
     features = data.drop(columns=columns_to_ignore).columns
     target = target_column
@@ -326,29 +598,12 @@ def prep_data(data, columns_to_ignore, target_column):
     val_features = scaler_features.transform(val_data[features])
     test_features = scaler_features.transform(test_data[features])
 
-    # Create the input sequences and corresponding labels for the LSTM model
-    def create_sequences(features, target, seq_length):
-        X = []
-        y = []
-        for i in range(len(features) - seq_length):
-            X.append(features[i:i+seq_length])
-            y.append(target[i+seq_length])
-        return np.array(X), np.array(y)
-
-    seq_length = 20  # Number of previous days to use as input
-    X_train, y_train = create_sequences(train_features, train_data[target].values, seq_length)
-    X_val, y_val = create_sequences(val_features, val_data[target].values, seq_length)
-    X_test, y_test = create_sequences(test_features, test_data[target].values, seq_length)
-
-    # Convert the data to PyTorch tensors
-    X_train = torch.tensor(X_train, dtype=torch.float32)
-    y_train = torch.tensor(y_train, dtype=torch.float32)
-    X_val = torch.tensor(X_val, dtype=torch.float32)
-    y_val = torch.tensor(y_val, dtype=torch.float32)
-    X_test = torch.tensor(X_test, dtype=torch.float32)
-    y_test = torch.tensor(y_test, dtype=torch.float32)
+    # Create the input sequences and corresponding labels for the LSTM model, as float32 views
+    train_set = SequenceDataset(train_features, train_data[target].values, seq_length)
+    val_set = SequenceDataset(val_features, val_data[target].values, seq_length)
+    test_set = SequenceDataset(test_features, test_data[target].values, seq_length)
     
-    return X_train, y_train, X_val, y_val, X_test, y_test, scaler_features
+    return train_set.X, train_set.y, val_set.X, val_set.y, test_set.X, test_set.y, scaler_features
 
 def load_model(path):
     model = torch.load(path)
@@ -360,4 +615,130 @@ def load_xgb(path):
 
 def load_scaler(path):
     scaler = joblib.load(path)
-    return scaler
\ No newline at end of file
+    return scaler
+
+# Training every city
+# Each city's models only depend on that city's features, so train_all_cities trains them in a process pool,
+# one city per worker, and splits the cores between the workers: every worker gets the same number of torch
+# threads and XGBoost n_jobs, so retraining all cities takes about as long as training one. The artifacts go
+# to the city's paths in stations.json (attn_lstm, lstm, xgb, scaler). They are all written to temporary files
+# first and only renamed into place once every model has trained, so a failure leaves the previous set intact
+# and run.ipynb never pairs a new scaler with old models. The LSTMs checkpoint under CHECKPOINT_PATH and a rerun
+# after a crash resumes them, as long as the features and the scaler are still the same (see checkpoint_key in
+# train_model); the checkpoints are removed once the new artifacts are in place.
+CHECKPOINT_PATH = "./checkpoints"
+TARGET_COLUMN = 'next_day_max_temp'
+# attn_lstm and XGBoost use the settings from LSTM_notebook.ipynb and Ensenmble_Regression_notebook.ipynb.
+# The notebooks don't record how the deployed lstm model was trained, so its entry is a copy of the attn_lstm one.
+LSTM_PARAMS = {
+    "attn_lstm": {"model": {"dropout_rate": 0.2, "num_layers": 2, "hidden_size": 32},
+                  "train": {"lr": 0.005, "l2_lambda": 0.01, "epochs": 10}},
+    "lstm": {"model": {"dropout_rate": 0.2, "num_layers": 2, "hidden_size": 32},
+             "train": {"lr": 0.005, "l2_lambda": 0.01, "epochs": 10}},
+}
+XGB_PARAMS = {"n_estimators": 1000, "learning_rate": 0.01, "early_stopping_rounds": 15, "min_child_weight": 1}
+
+def get_scaler_fingerprint(scaler):
+    # feature columns and fitted statistics, anything trained on other features or scaling won't match
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(name) for name in scaler.feature_names_in_]).encode())
+    digest.update(np.ascontiguousarray(scaler.mean_, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(scaler.scale_, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def stage_artifact(staged, path, save):
+    # written next to its final path, put in place by train_city_models once everything trained
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    save(path + '.tmp')
+    staged[path] = path + '.tmp'
+
+def train_city_models(city, num_threads=None, patience=None):
+    # trains and saves one city's scaler, attention LSTM, LSTM and XGBoost model, returns their test scores
+    # imported here: df_utils pulls in the whole ingestion stack and xgboost is only needed for training
+    from df_utils import cached_load_all_dfs
+    from xgboost import XGBRegressor
+    started = time.time()
+    num_threads = set_training_threads(num_threads)
+    info = get_city_info()[city]
+    _, _, _, all_df, _ = cached_load_all_dfs(info['noaa'], info['om'], info['ss'], info['wrh'], info['aq'])
+    columns_to_ignore = ['date', TARGET_COLUMN]
+    results = {"city": city, "threads": num_threads}
+    
+    X_train, y_train, X_val, y_val, X_test, y_test, scaler_features = prep_data(all_df, columns_to_ignore, TARGET_COLUMN)
+    checkpoint_key = {"features": [str(name) for name in scaler_features.feature_names_in_],
+                      "scaler": get_scaler_fingerprint(scaler_features)}
+    staged = {}
+    checkpoints = []
+    try:
+        stage_artifact(staged, info['scaler'], lambda path: joblib.dump(scaler_features, path))
+        for model_type, params in LSTM_PARAMS.items():
+            checkpoint_path = f"{CHECKPOINT_PATH}/{city}_{model_type}.pt"
+            model = get_model(X_train, y_train, model_type=model_type, **params["model"])
+            model = train_model(model, X_train, y_train, X_val, y_val, num_threads=num_threads, patience=patience,
+                                checkpoint_path=checkpoint_path, resume=True, checkpoint_key=checkpoint_key,
+                                name=f"{city} {model_type}", **params["train"])
+            checkpoints.append(checkpoint_path)
+            model.eval()
+            results[f"{model_type}_test_loss"] = get_test_loss(model, X_test, y_test)
+            stage_artifact(staged, info[model_type], lambda path: torch.save(model, path))
+        
+        # XGBoost on the same split as the notebook, scaled with the new scaler
+        X = all_df.drop(columns=columns_to_ignore)
+        y = all_df[TARGET_COLUMN]
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, shuffle=False)
+        X_val, X_test, y_val, y_test = train_test_split(X_test, y_test, test_size=0.5, shuffle=False)
+        X_train_scaled = scaler_features.transform(X_train)
+        X_val_scaled = scaler_features.transform(X_val)
+        X_test_scaled = scaler_features.transform(X_test)
+        xgb_model = XGBRegressor(n_jobs=num_threads, **XGB_PARAMS)
+        xgb_model.fit(X_train_scaled, y_train, eval_set=[(X_train_scaled, y_train), (X_val_scaled, y_val)], verbose=False)
+        results["xgb_test_loss"] = float(np.mean((xgb_model.predict(X_test_scaled) - y_test) ** 2))
+        stage_artifact(staged, info['xgb'], lambda path: joblib.dump(xgb_model, path))
+    except BaseException:
+        for tmp_path in staged.values():
+            os.remove(tmp_path)
+        raise
+    
+    # every model trained, the new set replaces the old one together
+    for path, tmp_path in staged.items():
+        os.replace(tmp_path, path)
+    for checkpoint_path in checkpoints:
+        os.remove(checkpoint_path)
+    
+    results["seconds"] = time.time() - started
+    return results
+
+def train_all_cities(cities=None, max_workers=None, patience=None):
+    # one worker per city, the cores split evenly between them, returns the test scores per city
+    if cities is None:
+        cities = list(get_city_info().keys())
+    cores = get_cpu_count()
+    workers = max(min(len(cities), max_workers or cores), 1)
+    num_threads = max(cores // workers, 1)
+    print(f"Training {len(cities)} cities with {workers} processes, {num_threads} threads each")
+    
+    results = []
+    failures = {}
+    if workers == 1:
+        for city in cities:
+            try:
+                results.append(train_city_models(city, num_threads, patience))
+            except Exception as e:
+                failures[city] = e
+    else:
+        with get_process_pool(workers) as executor:
+            futures = {executor.submit(train_city_models, city, num_threads, patience): city for city in cities}
+            for future in as_completed(futures):
+                city = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failures[city] = e
+    # models this process already loaded for the retrained cities are stale now
+    for result in results:
+        get_station_registry().invalidate(result["city"])
+    if failures:
+        print(f"Training failed for {sorted(failures)}: {failures}")
+    return pd.DataFrame(results), failures
@@ -1,21 +1,27 @@
+import atexit
+import hashlib
+import json
 import os
+import queue
 import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 
+import numpy as np
 import pandas as pd
-import re
 
+from station_utils import *
+from store_utils import *
+from http_utils import *
+from telemetry_utils import *
+
+# selenium is only needed to read the MesoWest token off the WRH page
 from selenium import webdriver
-from selenium.common import TimeoutException, NoSuchElementException, StaleElementReferenceException, \
-    NoSuchWindowException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 
-# Webdriver code (get_webdriver, and safe_find_element) adapted from
+# Webdriver code (get_webdriver) adapted from
 # @misc{dong2024fnspid,
 #       title={FNSPID: A Comprehensive Financial News Dataset in Time Series}, 
 #       author={Zihan Dong and Xinyu Fan and Zhiyuan Peng},
@@ -56,334 +62,67 @@ def get_webdriver():
     driver = webdriver.Chrome(options=options)
     return driver
 
-def safe_find_element(driver, by, value):
-    try:
-        content = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((by, value))
-        )
-        return content
-    except StaleElementReferenceException:
-        time.sleep(2)
-        content = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((by, value))
-        )
-        return content
-
-def safe_click(driver, by, value):
+# Driver pool
+# Starting Chrome is the slowest part of scraping, so drivers are handed back to the pool after use
+# and the next city or source reuses the warm session. A driver that raised is quit instead of reused.
+class DriverPool:
+    def __init__(self, max_size=2):
+        self.max_size = max_size
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def driver(self):
+        self.slots.acquire()
+        try:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                driver = get_webdriver()
+            try:
+                yield driver
+            except Exception:
+                driver.quit()
+                raise
+            self.idle.put(driver)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+driver_pool = None
+driver_pool_lock = threading.Lock()
+
+def get_driver_pool(max_size=2):
+    global driver_pool
+    with driver_pool_lock:
+        if driver_pool is None:
+            driver_pool = DriverPool(max_size=max_size)
+            atexit.register(driver_pool.close)
+        return driver_pool
+
+# ACIS marks missing ('M'), trace ('T'), multi-day ('S') and accumulated ('A') values with letters instead of
+# numbers, and leaves some cells empty ('')
+ACIS_NA_VALUES = ['M', 'T', 'S', 'A', '']
+
+def acis_to_numeric(df):
+    # fast path: every value is a number or a sentinel, so one C-level cast does the whole frame
     try:
-        element = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((by, value))
-        )
-        element.click()
-    except StaleElementReferenceException:
-        time.sleep(2)
-        element = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((by, value))
-        )
-        element.click()
-
-def daily_data_listing(driver):
-    # Click on the "Single-Station Products" menu
-    single_station_menu = safe_find_element(driver, By.ID, 'single')
-    safe_click(driver, By.ID, 'single')
-
-    # Wait for the menu to expand and be clickable
-    daily_data_listing = WebDriverWait(driver, 15).until(
-        EC.element_to_be_clickable((By.ID, 'ui-id-4'))
-    )
-    safe_click(driver, By.ID, 'ui-id-4')
-
-    # Select the output format
-    csv_label = WebDriverWait(driver, 10).until(
-    EC.element_to_be_clickable((By.CSS_SELECTOR, 'label[for="outopt_csv"]'))
-    )
-    csv_label = safe_find_element(driver, By.CSS_SELECTOR, 'label[for="outopt_csv"]')
-    #safe_click(driver, By.CSS_SELECTOR, 'label[for="outopt_csv"]')
-    driver.execute_script("arguments[0].click();", csv_label)
-    
-    # Click on the calendar icon to open the date range picker
-    calendar_icon = safe_find_element(driver, By.ID, 'dp_calicon')
-    safe_click(driver, By.ID, 'dp_calicon')
-    return
-
-def daily_data_listing_por(driver, symbol):
-    url = "https://scacis.rcc-acis.org/"
-    
-    driver.get(url)
-    
-    # initial routine 
-    daily_data_listing(driver)
-    
-    # Wait for the date range picker to be visible
-    date_range_picker = WebDriverWait(driver, 15).until(
-        EC.visibility_of_element_located((By.CSS_SELECTOR, '.ui-daterangepicker'))
-    )
-
-    # Click on the "Period of Record" option
-    period_of_record = safe_find_element(driver, By.CSS_SELECTOR, '.ui-daterangepicker-PeriodofRecord')
-    safe_click(driver, By.CSS_SELECTOR, '.ui-daterangepicker-PeriodofRecord')
-
-    # Click on the checkboxes
-    click_all_checkboxes(driver)
-
-    # Put the symbol in the input box
-    input_symbol(driver, symbol)
-
-    # Click the "Go" button
-    click_go(driver)
-
-    # accept the pop up
-    accept_pop_up(driver)
-
-    csv_content = get_csv_content(driver)
-    
-    driver.quit()
-    
-    return csv_content
-
-def daily_data_listing_7_day(driver, symbol):
-    url = "https://scacis.rcc-acis.org/"
-    
-    driver.get(url)
-    
-    # initial routine 
-    daily_data_listing(driver)
-    
-    # Wait for the date range picker to be visible
-    date_range_picker = WebDriverWait(driver, 15).until(
-        EC.visibility_of_element_located((By.CSS_SELECTOR, '.ui-daterangepicker'))
-    )
-
-    # Click on the "Period of Record" option
-    period_of_record = safe_find_element(driver, By.CSS_SELECTOR, '.ui-daterangepicker-Last7Days')
-    safe_click(driver, By.CSS_SELECTOR, '.ui-daterangepicker-Last7Days')
+        return df.replace(ACIS_NA_VALUES, np.nan).astype('float64')
+    except (TypeError, ValueError):
+        # flagged values like '1.20A' are rare, only then fall back to coercing column by column
+        return df.apply(pd.to_numeric, errors='coerce').astype('float64')
 
-    # Click on the checkboxes
-    click_all_checkboxes(driver)
-
-    # Put the symbol in the input box
-    input_symbol(driver, symbol)
-
-    # Click the "Go" button
-    click_go(driver)
-
-    # accept the pop up
-    accept_pop_up(driver)
-
-    csv_content = get_csv_content(driver)
-    
-    driver.quit()
-    
-    return csv_content
-
-def input_symbol(driver, symbol):
-    # Assuming `station_select_menu` is the correct trigger element
-    station_select_menu = safe_find_element(driver, By.ID, 'station_acc')
-    driver.execute_script("arguments[0].click();", station_select_menu)
-    
-    # Wait for the station select input field to be visible (instead of just present)
-    station_select = WebDriverWait(driver, 15).until(
-        EC.visibility_of_element_located((By.CSS_SELECTOR, '.acis-idContainer input[type="text"]'))
-    )
-
-    # Clear the existing value and input the symbol
-    station_select.clear()
-    station_select.send_keys(symbol)
-
-def click_all_checkboxes(driver):
-    # Find all the checkboxes within the table
-    checkboxes = driver.find_elements(By.CSS_SELECTOR, '.acis-multiInputTable input[type="checkbox"]')
-    
-    # Click each checkbox using JavaScript
-    for checkbox in checkboxes:
-        if not checkbox.is_selected():
-            driver.execute_script("arguments[0].click();", checkbox)
-
-    time.sleep(2)  # Pause for 2 seconds to allow the checkboxes to be clicked
-
-def click_go(driver):
-    go_button = safe_find_element(driver, By.ID, 'go')
-    safe_click(driver, By.ID, 'go')
-
-def accept_pop_up(driver):
-    try:
-        # Wait for the alert to be present
-        WebDriverWait(driver, 5).until(EC.alert_is_present())
-        
-        # Switch to the alert and accept it
-        alert = driver.switch_to.alert
-        alert.accept()
-        
-        #print("Pop-up alert accepted.")
-    except TimeoutException:
-        # Handle the case where the alert does not appear within 5 seconds
-        #print("No pop-up alert to accept.")
-        # do nothing
-        pass
-
-def get_csv_content(driver):
-    # Wait for the CSV data to be present in the results_area
-    csv_data = WebDriverWait(driver, 60).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, '#results_area pre'))
-    )
-
-    # Get the text content of the <pre> element
-    csv_content = csv_data.get_attribute('textContent')
-
-    return csv_content
-
-def process_daily_data_noaa_csv(csv_content):
-    pattern = re.compile(r'(\d{4}-\d{2}-\d{2})')
-    corrected_content = re.sub(pattern, r'\n\1', csv_content)
-    corrected_list = corrected_content.split('\n')
-    
-    # The first line has the clumn names and the title
-    first_line = corrected_list.pop(0)
-    column_names = first_line.split(', ')
-    column_names.pop(0)
-    # rename the first column name to 'Date'
-    column_names[0] = 'Date'
-    
-    # The rest of the lines are the data
-    data = []
-    for line in corrected_list:
-        data.append(line.split(', '))
-        
-    df = pd.DataFrame(data, columns=column_names)
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # For other columns try to convert to numeric
-    for column in df.columns[1:]:  # Skip the first column ('Date')
-        df[column] = pd.to_numeric(df[column], errors='coerce')
-    
-    return df
-
-# Station Info:
-# Chicago - KMDW, Elev: 617.0 ft; Lat: 41.78417, Lon: -87.75528
-# NYC - KNYC, Elev: 154.0 ft; Lat: 40.78333, Lon: -73.96667
-# Miami - KMIA, Elev: 10.0 ft; Lat: 25.79056, Lon: -80.31639
-# Austin - KAUS, Elev: 486.0 ft; Lat: 30.18304, Lon: -97.67987
-def get_city_info():
-    # Austin
-    noaa_austin_path = './data/Austin_NOAA.csv'
-    om_austin_path = './data/Austin_OM.csv'
-    wrh_austin_path = './data/Austin_WRH.csv'
-    air_austin_path = './data/Austin_Air_Quality.csv'
-    solar_austin_path = './data/Austin_Solar_Soil.csv'
-    attn_lstm_autin_path = './models/Austin_attn_lstm.pt'
-    lstm_austin_path = './models/Austin_lstm.pt'
-    xgb_austin_path = './models/Austin_xgb.pkl'
-    scaler_austin_path = './models/Austin_scaler_features.pkl'
-    history_austin_path = './history/Austin_history.csv'
-    # NYC
-    noaa_nyc_path = './data/NYC_NOAA.csv'
-    om_nyc_path = './data/NYC_OM.csv'
-    wrh_nyc_path = './data/NYC_WRH.csv'
-    air_nyc_path = './data/NYC_Air_Quality.csv'
-    solar_nyc_path = './data/NYC_Solar_Soil.csv'
-    attn_nyc_path = './models/NYC_attn_lstm.pt'
-    lstm_nyc_path = './models/NYC_lstm.pt'
-    xgb_nyc_path = './models/NYC_xgb.pkl'
-    scaler_nyc_path = './models/NYC_scaler_features.pkl'
-    history_nyc_path = './history/NYC_history.csv'
-    # Miami
-    noaa_miami_path = './data/Miami_NOAA.csv'
-    om_miami_path = './data/Miami_OM.csv'
-    wrh_miami_path = './data/Miami_WRH.csv'
-    air_miami_path = './data/Miami_Air_Quality.csv'
-    solar_miami_path = './data/Miami_Solar_Soil.csv'
-    attn_lstm_miami_path = './models/Miami_attn_lstm.pt'
-    lstm_miami_path = './models/Miami_lstm.pt'
-    xgb_miami_path = './models/Miami_xgb.pkl'
-    scaler_miami_path = './models/Miami_scaler_features.pkl'
-    history_miami_path = './history/Miami_history.csv'
-    # Chicago
-    noaa_chicago_path = './data/Chicago_NOAA.csv'
-    om_chicago_path = './data/Chicago_OM.csv'
-    wrh_chicago_path = './data/Chicago_WRH.csv'
-    air_chicago_path = './data/Chicago_Air_Quality.csv'
-    solar_chicago_path = './data/Chicago_Solar_Soil.csv'   
-    attn_lstm_chicago_path = './models/Chicago_attn_lstm.pt'
-    lstm_chicago_path = './models/Chicago_lstm.pt'
-    xgb_chicago_path = './models/Chicago_xgb.pkl'
-    scaler_chicago_path = './models/Chicago_scaler_features.pkl'
-    history_chicago_path = './history/Chicago_history.csv'
-    
-    info = {
-        "Chicago": {
-            "station": "KMDW", 
-            "elev": 617.0, 
-            "lat": 41.78417, 
-            "lon": -87.75528, 
-            "tz": "America/Chicago",
-            "noaa": noaa_chicago_path,
-            "om": om_chicago_path,
-            "wrh": wrh_chicago_path,
-            "aq": air_chicago_path,
-            "ss": solar_chicago_path,
-            "attn_lstm": attn_lstm_chicago_path,
-            "lstm": lstm_chicago_path,
-            "xgb": xgb_chicago_path,
-            "scaler": scaler_chicago_path,
-            "kalshi": "HIGHCHI",
-            "history": history_chicago_path},
-        "NYC": {
-            "station": "KNYC",
-            "elev": 154.0,
-            "lat": 40.78333,
-            "lon": -73.96667,
-            "tz": "America/New_York",
-            "noaa": noaa_nyc_path,
-            "om": om_nyc_path,
-            "wrh": wrh_nyc_path,
-            "aq": air_nyc_path,
-            "ss": solar_nyc_path,
-            "attn_lstm": attn_nyc_path,
-            "lstm": lstm_nyc_path,
-            "xgb": xgb_nyc_path,
-            "scaler": scaler_nyc_path,
-            "kalshi": "HIGHNY",
-            "history": history_nyc_path},
-        "Miami": {
-            "station": "KMIA", 
-            "elev": 10.0, 
-            "lat": 25.79056, 
-            "lon": -80.31639, 
-            "tz": "America/New_York",
-            "noaa": noaa_miami_path,
-            "om": om_miami_path,
-            "wrh": wrh_miami_path,
-            "aq": air_miami_path,
-            "ss": solar_miami_path,
-            "attn_lstm": attn_lstm_miami_path,
-            "lstm": lstm_miami_path,
-            "xgb": xgb_miami_path,
-            "scaler": scaler_miami_path,
-            "kalshi": "HIGHMIA",
-            "history": history_miami_path},
-        "Austin": {
-            "station": "KAUS", 
-            "elev": 486.0, 
-            "lat": 30.18304, 
-            "lon": -97.67987, 
-            "tz": "America/Chicago",
-            "noaa": noaa_austin_path,
-            "om": om_austin_path,
-            "wrh": wrh_austin_path,
-            "aq": air_austin_path,
-            "ss": solar_austin_path,
-            "attn_lstm": attn_lstm_autin_path,
-            "lstm": lstm_austin_path,
-            "xgb": xgb_austin_path,
-            "scaler": scaler_austin_path,
-            "kalshi": "HIGHAUS",
-            "history": history_austin_path}
-    }
-    return info
-
-def get_time_zone(city):
-    city_info = get_city_info()
-    return city_info[city]["tz"]
+# Station info (coordinates, timezones, tickers, paths) lives in stations.json, see station_utils.py
 
 # Useful Functions
 def F_to_C(F):
@@ -392,6 +131,89 @@ def F_to_C(F):
 def C_to_F(C):
     return C * 9.0/5.0 + 32
 
+# ACIS data service client
+# The scacis.rcc-acis.org UI is a front end for the ACIS web services, so we can skip the browser
+# and ask the service directly. One MultiStnData request covers every station, and each station comes
+# back as one frame: a Date column plus the ACIS_DAILY_ELEMENTS columns as float64, sentinels as NaN.
+# base_url can point at a local stand-in server for testing.
+ACIS_URL = "https://data.rcc-acis.org"
+# MultiStnData has no "por" shortcut, so period of record starts here and leading empty rows are trimmed
+ACIS_POR_START = "1869-01-01"
+
+# (column name, ACIS element) in the same order as the SC-ACIS daily data listing
+ACIS_DAILY_ELEMENTS = [
+    ("MaxTemperature", {"name": "maxt"}),
+    ("MaxTemperatureNormal", {"name": "maxt", "normal": "1"}),
+    ("MaxTemperatureDeparture", {"name": "maxt", "normal": "departure"}),
+    ("MinTemperature", {"name": "mint"}),
+    ("MinTemperatureNormal", {"name": "mint", "normal": "1"}),
+    ("MinTemperatureDeparture", {"name": "mint", "normal": "departure"}),
+    ("AvgTemperature", {"name": "avgt"}),
+    ("AvgTemperatureNormal", {"name": "avgt", "normal": "1"}),
+    ("AvgTemperatureDeparture", {"name": "avgt", "normal": "departure"}),
+    ("Precipitation", {"name": "pcpn"}),
+    ("PrecipitationNormal", {"name": "pcpn", "normal": "1"}),
+    ("PrecipitationDeparture", {"name": "pcpn", "normal": "departure"}),
+    ("Snowfall", {"name": "snow"}),
+    ("SnowfallNormal", {"name": "snow", "normal": "1"}),
+    ("SnowfallDeparture", {"name": "snow", "normal": "departure"}),
+    ("SnowDepth", {"name": "snwd"}),
+    ("HDD", {"name": "hdd"}),
+    ("HDDNormal", {"name": "hdd", "normal": "1"}),
+    ("HDDDeparture", {"name": "hdd", "normal": "departure"}),
+    ("CDD", {"name": "cdd"}),
+    ("CDDNormal", {"name": "cdd", "normal": "1"}),
+    ("CDDDeparture", {"name": "cdd", "normal": "departure"}),
+    ("GDD", {"name": "gdd"}),
+    ("AtObsTemperature", {"name": "obst"}),
+]
+
+def acis_rows_to_frame(dates, rows):
+    column_names = [name for name, _ in ACIS_DAILY_ELEMENTS]
+    df = pd.DataFrame(rows, columns=column_names)
+    # sentinels and flagged values become NaN
+    df = acis_to_numeric(df)
+    df.insert(0, 'Date', dates)
+    return df
+
+def fetch_acis_daily(station_ids, start_date, end_date, base_url=ACIS_URL, timeout=120):
+    params = {
+        "sids": ",".join(station_ids),
+        "sdate": start_date,
+        "edate": end_date,
+        "elems": [elem for _, elem in ACIS_DAILY_ELEMENTS],
+        "meta": "sids",
+    }
+    with telemetry_stage("fetch", source="NOAA"):
+        response = get_http_session().post(f"{base_url}/MultiStnData", json=params, timeout=timeout)
+        response.raise_for_status()
+        payload = response.json()
+    if "error" in payload:
+        raise RuntimeError(f"ACIS error: {payload['error']}")
+    
+    dates = pd.date_range(start_date, end_date, freq="D")
+    frames = {}
+    with telemetry_stage("parse", source="NOAA"):
+        for station in payload.get("data", []):
+            # meta sids look like ["KMDW 5", "14819 1", ...], match them back to what we asked for
+            sids = [sid.split(' ')[0] for sid in station["meta"]["sids"]]
+            station_id = next((sid for sid in station_ids if sid in sids), None)
+            if station_id is None:
+                continue
+            frames[station_id] = acis_rows_to_frame(dates, station["data"])
+    
+    missing = [sid for sid in station_ids if sid not in frames]
+    if missing:
+        raise RuntimeError(f"ACIS returned no data for {missing}")
+    return frames
+
+def trim_leading_missing(df):
+    # drop the rows before the station started reporting
+    has_data = df.drop(columns=['Date']).notna().any(axis=1)
+    if not has_data.any():
+        return df.iloc[0:0]
+    return df.loc[has_data.idxmax():].reset_index(drop=True)
+
 # Data source 1:
 # 1. NOAA Daily Aggregated Data (For sure - Daily model)
 # Process:
@@ -400,407 +222,288 @@ def C_to_F(C):
 # KMDW_NOAA.csv, KNYC_NOAA.csv, KMIA_NOAA.csv, KAUS_NOAA.csv
 # If they exist tshe code will read them and see which days are missing and then download the missing days from the NOAA API.
 # If the files do not exist, the code will download all the data from the NOAA API.
-def load_NOAA_data():
+def load_NOAA_data(cities=None, base_url=ACIS_URL):
     data_path = "./data"
     # Get city dict
     city_info = get_city_info()
     # city_list
-    city_list = list(city_info.keys())
-    # for each city in city_list, look in the data folder for the file
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    station_ids = [city_info[city]["station"] for city in city_list]
+    # one request for every station, period of record up to yesterday
+    yesterday = (pd.to_datetime("now") - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    frames = fetch_acis_daily(station_ids, ACIS_POR_START, yesterday, base_url=base_url)
     for city in city_list:
         city_file = f"{data_path}/{city}_NOAA.csv"
-        city_station_id = city_info[city]["station"]
-        driver = get_webdriver()
-        # if the file does not exist, download the noaa data
-        csv_historic_content = daily_data_listing_por(driver, city_station_id)
-        df = process_daily_data_noaa_csv(csv_historic_content)
-        driver = get_webdriver()
-        csv_new_content = daily_data_listing_7_day(driver, city_station_id)
-        df_new = process_daily_data_noaa_csv(csv_new_content)
-        # Add the last row of the new data to the historic data
-        df = pd.concat([df, df_new.tail(1)], ignore_index=True)
-        df.to_csv(city_file, index=False)
-        # Ideally we would append the new data to the existing file, but for now we will overwrite it (does not take too long (4min))
+        df = trim_leading_missing(frames[city_info[city]["station"]])
+        write_source(city_file, df)
         
 # Data source 2:
 # OpenMeteo
 # Will be used to fill in the gaps in the NOAA data
 
-def update_NOAA_data():
+def update_NOAA_data(cities=None, base_url=ACIS_URL):
     data_path = "./data"
     # Get city dict
     city_info = get_city_info()
-    # city_list
-    city_list = list(city_info.keys())
+    # city_list (defaults to every city)
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    last_dates = {city: get_last_time(f"{data_path}/{city}_NOAA.csv") for city in city_list}
+    
+    # one request covering the oldest last date across all cities, up to yesterday
+    start_date = min(last_dates.values()) + pd.Timedelta(days=1)
+    today = pd.to_datetime("now").normalize()
+    if start_date >= today:
+        return
+    end_date = today - pd.Timedelta(days=1)
+    station_ids = [city_info[city]["station"] for city in city_list]
+    frames = fetch_acis_daily(station_ids, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"),
+                              base_url=base_url)
+    
     for city in city_list:
         city_file = f"{data_path}/{city}_NOAA.csv"
-        city_station_id = city_info[city]["station"]
-        driver = get_webdriver()
-        csv_new_content = daily_data_listing_7_day(driver, city_station_id)
-        df_new = process_daily_data_noaa_csv(csv_new_content)
-        old_df = pd.read_csv(city_file)
-        old_df['Date'] = pd.to_datetime(old_df['Date'])  # Convert 'Date' to datetime
-        last_date = old_df['Date'].iloc[-1]
-        new_df = df_new[df_new['Date'] > last_date]
-        today = pd.to_datetime("now").date().strftime("%Y-%m-%d")
-        new_df = new_df[new_df['Date'] < today]
-        new_df['Date'] = pd.to_datetime(new_df['Date'])  # Convert 'Date' to datetime
-        df = pd.concat([old_df, new_df], ignore_index=True)
-        df.to_csv(city_file, index=False)
+        df_new = frames[city_info[city]["station"]]
+        new_df = df_new[df_new['Date'] > last_dates[city]]
+        append_source(city_file, new_df)
 
 import openmeteo_requests
 import requests_cache
-from retry_requests import retry
 
-def load_OM_data():
+# Open-Meteo sources
+# Every Open-Meteo source is declared once here: endpoint, time resolution, variables and extra parameters.
+# fetch_open_meteo sends all cities in a single request (the API takes lists of coordinates and answers
+# with one response per location) and decodes each location into one preallocated float32 array.
+OM_DAILY_VARIABLES = ["weather_code", "temperature_2m_max", "temperature_2m_min", "apparent_temperature_max", "apparent_temperature_min", "sunrise", "sunset", "daylight_duration", "sunshine_duration", "precipitation_sum", "rain_sum", "snowfall_sum", "precipitation_hours", "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant", "shortwave_radiation_sum", "et0_fao_evapotranspiration"]
+SOLAR_SOIL_VARIABLES = ["soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm", "soil_temperature_100_to_255cm", "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm", "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm", "shortwave_radiation", "direct_radiation", "diffuse_radiation", "direct_normal_irradiance", "global_tilted_irradiance", "terrestrial_radiation", "shortwave_radiation_instant", "direct_radiation_instant", "diffuse_radiation_instant", "direct_normal_irradiance_instant", "global_tilted_irradiance_instant", "terrestrial_radiation_instant"]
+AIR_QUALITY_VARIABLES = ["pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "sulphur_dioxide", "ozone", "aerosol_optical_depth", "dust", "uv_index", "uv_index_clear_sky", "ammonia", "alder_pollen", "birch_pollen", "grass_pollen", "mugwort_pollen", "olive_pollen", "ragweed_pollen", "us_aqi", "us_aqi_pm2_5", "us_aqi_pm10", "us_aqi_nitrogen_dioxide", "us_aqi_carbon_monoxide", "us_aqi_ozone", "us_aqi_sulphur_dioxide"]
+
+# "local_time" sends each city's timezone so days are cut at local midnight
+OPEN_METEO_SOURCES = {
+    "OM": {
+        "url": "https://archive-api.open-meteo.com/v1/archive",
+        "resolution": "daily",
+        "variables": OM_DAILY_VARIABLES,
+        "params": {"temperature_unit": "fahrenheit"},
+        "local_time": False,
+    },
+    "OM_forecast": {
+        "url": "https://api.open-meteo.com/v1/forecast",
+        "resolution": "daily",
+        "variables": OM_DAILY_VARIABLES,
+        "params": {"temperature_unit": "fahrenheit", "past_days": 1, "forecast_days": 0},
+        "local_time": False,
+        # ends up in the OM files, so that is where its telemetry goes too
+        "dataset": "OM",
+    },
+    "Solar_Soil": {
+        "url": "https://archive-api.open-meteo.com/v1/archive",
+        "resolution": "hourly",
+        "variables": SOLAR_SOIL_VARIABLES,
+        "params": {},
+        "local_time": True,
+    },
+    "Air_Quality": {
+        "url": "https://air-quality-api.open-meteo.com/v1/air-quality",
+        "resolution": "hourly",
+        "variables": AIR_QUALITY_VARIABLES,
+        "params": {},
+        "local_time": True,
+    },
+}
+
+# the API caps the number of locations per call, larger city lists are split into batches
+OPEN_METEO_MAX_LOCATIONS = 50
+
+def get_open_meteo_client(expire_after=-1):
     # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after=-1)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    openmeteo = openmeteo_requests.Client(session=retry_session)
-    
-    def get_historical_data(latitude, longitude, start_date, end_date):
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "start_date": start_date,
-            "end_date": end_date,
-            "daily": ["weather_code", "temperature_2m_max", "temperature_2m_min", "apparent_temperature_max", "apparent_temperature_min", "sunrise", "sunset", "daylight_duration", "sunshine_duration", "precipitation_sum", "rain_sum", "snowfall_sum", "precipitation_hours", "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant", "shortwave_radiation_sum", "et0_fao_evapotranspiration"],
-            "temperature_unit": "fahrenheit"
-        }
-        responses = openmeteo.weather_api(url, params=params)
-        response = responses[0]
-        
-        daily = response.Daily()
-        daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-        daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-        daily_temperature_2m_min = daily.Variables(2).ValuesAsNumpy()
-        daily_apparent_temperature_max = daily.Variables(3).ValuesAsNumpy()
-        daily_apparent_temperature_min = daily.Variables(4).ValuesAsNumpy()
-        daily_sunrise = daily.Variables(5).ValuesAsNumpy()
-        daily_sunset = daily.Variables(6).ValuesAsNumpy()
-        daily_daylight_duration = daily.Variables(7).ValuesAsNumpy()
-        daily_sunshine_duration = daily.Variables(8).ValuesAsNumpy()
-        daily_precipitation_sum = daily.Variables(9).ValuesAsNumpy()
-        daily_rain_sum = daily.Variables(10).ValuesAsNumpy()
-        daily_snowfall_sum = daily.Variables(11).ValuesAsNumpy()
-        daily_precipitation_hours = daily.Variables(12).ValuesAsNumpy()
-        daily_wind_speed_10m_max = daily.Variables(13).ValuesAsNumpy()
-        daily_wind_gusts_10m_max = daily.Variables(14).ValuesAsNumpy()
-        daily_wind_direction_10m_dominant = daily.Variables(15).ValuesAsNumpy()
-        daily_shortwave_radiation_sum = daily.Variables(16).ValuesAsNumpy()
-        daily_et0_fao_evapotranspiration = daily.Variables(17).ValuesAsNumpy()
-        
-        daily_data = {"date": pd.date_range(
-            start = pd.to_datetime(daily.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(daily.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = daily.Interval()),
-            inclusive = "left"
-        )}
-        daily_data["weather_code"] = daily_weather_code
-        daily_data["temperature_2m_max"] = daily_temperature_2m_max
-        daily_data["temperature_2m_min"] = daily_temperature_2m_min
-        daily_data["apparent_temperature_max"] = daily_apparent_temperature_max
-        daily_data["apparent_temperature_min"] = daily_apparent_temperature_min
-        daily_data["sunrise"] = daily_sunrise
-        daily_data["sunset"] = daily_sunset
-        daily_data["daylight_duration"] = daily_daylight_duration
-        daily_data["sunshine_duration"] = daily_sunshine_duration
-        daily_data["precipitation_sum"] = daily_precipitation_sum
-        daily_data["rain_sum"] = daily_rain_sum
-        daily_data["snowfall_sum"] = daily_snowfall_sum
-        daily_data["precipitation_hours"] = daily_precipitation_hours
-        daily_data["wind_speed_10m_max"] = daily_wind_speed_10m_max
-        daily_data["wind_gusts_10m_max"] = daily_wind_gusts_10m_max
-        daily_data["wind_direction_10m_dominant"] = daily_wind_direction_10m_dominant
-        daily_data["shortwave_radiation_sum"] = daily_shortwave_radiation_sum
-        daily_data["et0_fao_evapotranspiration"] = daily_et0_fao_evapotranspiration
-        
-        return pd.DataFrame(data=daily_data)
+    cache_session = requests_cache.CachedSession('.cache', expire_after=expire_after)
+    # retries on server errors, plus the shared Open-Meteo rate limiter (cache hits never touch it)
+    retry_session = get_rate_limited_session(cache_session, retries=5, backoff_factor=0.2)
+    return openmeteo_requests.Client(session=retry_session)
+
+def decode_open_meteo_block(block, variables):
+    times = pd.date_range(
+        start = pd.to_datetime(block.Time(), unit = "s", utc = True),
+        end = pd.to_datetime(block.TimeEnd(), unit = "s", utc = True),
+        freq = pd.Timedelta(seconds = block.Interval()),
+        inclusive = "left"
+    )
+    # variables come back in the order they were requested, fill them straight into one float32 block
+    values = np.empty((len(times), len(variables)), dtype=np.float32)
+    for i in range(len(variables)):
+        values[:, i] = block.Variables(i).ValuesAsNumpy()
+    df = pd.DataFrame(values, columns=variables, copy=False)
+    df.insert(0, "date", times)
+    return df
 
-    def get_forecast_data(latitude, longitude):
-        url = "https://api.open-meteo.com/v1/forecast"
+def fetch_open_meteo(source, cities, start_date=None, end_date=None, client=None):
+    # returns {city: DataFrame} with a utc "date" column followed by the source's variables
+    spec = OPEN_METEO_SOURCES[source]
+    city_info = get_city_info()
+    if client is None:
+        client = get_open_meteo_client()
+    cities = list(cities)
+    results = {}
+    for i in range(0, len(cities), OPEN_METEO_MAX_LOCATIONS):
+        batch = cities[i:i + OPEN_METEO_MAX_LOCATIONS]
         params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "temperature_2m",
-            "daily": ["weather_code", "temperature_2m_max", "temperature_2m_min", "apparent_temperature_max", "apparent_temperature_min", "sunrise", "sunset", "daylight_duration", "sunshine_duration", "precipitation_sum", "rain_sum", "snowfall_sum", "precipitation_hours", "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant", "shortwave_radiation_sum", "et0_fao_evapotranspiration"],
-            "temperature_unit": "fahrenheit",
-            "past_days": 1,
-            "forecast_days": 0
+            "latitude": [city_info[city]["lat"] for city in batch],
+            "longitude": [city_info[city]["lon"] for city in batch],
+            spec["resolution"]: spec["variables"],
+            **spec["params"],
         }
-        responses = openmeteo.weather_api(url, params=params)
-        response = responses[0]
-        
-        hourly = response.Hourly()
-        hourly_temperature_2m = hourly.Variables(0).ValuesAsNumpy()
-        
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["temperature_2m"] = hourly_temperature_2m
-        
-        hourly_dataframe = pd.DataFrame(data=hourly_data)
-        
-        daily = response.Daily()
-        daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-        daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-        daily_temperature_2m_min = daily.Variables(2).ValuesAsNumpy()
-        daily_apparent_temperature_max = daily.Variables(3).ValuesAsNumpy()
-        daily_apparent_temperature_min = daily.Variables(4).ValuesAsNumpy()
-        daily_sunrise = daily.Variables(5).ValuesAsNumpy()
-        daily_sunset = daily.Variables(6).ValuesAsNumpy()
-        daily_daylight_duration = daily.Variables(7).ValuesAsNumpy()
-        daily_sunshine_duration = daily.Variables(8).ValuesAsNumpy()
-        daily_precipitation_sum = daily.Variables(9).ValuesAsNumpy()
-        daily_rain_sum = daily.Variables(10).ValuesAsNumpy()
-        daily_snowfall_sum = daily.Variables(11).ValuesAsNumpy()
-        daily_precipitation_hours = daily.Variables(12).ValuesAsNumpy()
-        daily_wind_speed_10m_max = daily.Variables(13).ValuesAsNumpy()
-        daily_wind_gusts_10m_max = daily.Variables(14).ValuesAsNumpy()
-        daily_wind_direction_10m_dominant = daily.Variables(15).ValuesAsNumpy()
-        daily_shortwave_radiation_sum = daily.Variables(16).ValuesAsNumpy()
-        daily_et0_fao_evapotranspiration = daily.Variables(17).ValuesAsNumpy()
-        
-        daily_data = {"date": pd.date_range(
-            start = pd.to_datetime(daily.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(daily.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = daily.Interval()),
-            inclusive = "left"
-        )}
-        daily_data["weather_code"] = daily_weather_code
-        daily_data["temperature_2m_max"] = daily_temperature_2m_max
-        daily_data["temperature_2m_min"] = daily_temperature_2m_min
-        daily_data["apparent_temperature_max"] = daily_apparent_temperature_max
-        daily_data["apparent_temperature_min"] = daily_apparent_temperature_min
-        daily_data["sunrise"] = daily_sunrise
-        daily_data["sunset"] = daily_sunset
-        daily_data["daylight_duration"] = daily_daylight_duration
-        daily_data["sunshine_duration"] = daily_sunshine_duration
-        daily_data["precipitation_sum"] = daily_precipitation_sum
-        daily_data["rain_sum"] = daily_rain_sum
-        daily_data["snowfall_sum"] = daily_snowfall_sum
-        daily_data["precipitation_hours"] = daily_precipitation_hours
-        daily_data["wind_speed_10m_max"] = daily_wind_speed_10m_max
-        daily_data["wind_gusts_10m_max"] = daily_wind_gusts_10m_max
-        daily_data["wind_direction_10m_dominant"] = daily_wind_direction_10m_dominant
-        daily_data["shortwave_radiation_sum"] = daily_shortwave_radiation_sum
-        daily_data["et0_fao_evapotranspiration"] = daily_et0_fao_evapotranspiration
-        
-        daily_dataframe = pd.DataFrame(data=daily_data)
-        
-        return hourly_dataframe, daily_dataframe
-
-    # Example usage
+        if start_date is not None:
+            params["start_date"] = str(start_date)
+            params["end_date"] = str(end_date)
+        if spec["local_time"]:
+            params["timezone"] = ",".join(get_time_zone(city) for city in batch)
+        with telemetry_stage("fetch", source=spec.get("dataset", source)):
+            responses = client.weather_api(spec["url"], params=params)
+        # one response per location, in the order the coordinates were sent
+        with telemetry_stage("parse", source=spec.get("dataset", source)):
+            for city, response in zip(batch, responses):
+                block = response.Daily() if spec["resolution"] == "daily" else response.Hourly()
+                results[city] = decode_open_meteo_block(block, spec["variables"])
+    return results
+
+# Historical backfills are split into chunks that never change once the archive has settled:
+# whole years, then whole months of the current year, plus one small "recent" chunk that is always refetched.
+# Settled chunks are cached on disk under a hash of everything that defines the response, so a re-run
+# (or a backfill that died half way) only downloads what is actually new. A full backfill can cost more than
+# Open-Meteo's daily budget: when that runs out the backfill stops, keeps the chunks it has, and the loaders
+# write nothing until a later run (after the budget resets) has fetched the rest.
+OPEN_METEO_CHUNK_CACHE = "./.om_chunks"
+# the archive keeps revising recent days (preliminary reanalysis is replaced after a few months)
+OPEN_METEO_SETTLE_DAYS = 90
+
+def get_history_chunks(start_date, end_date, settle_days=OPEN_METEO_SETTLE_DAYS):
+    # [(chunk_start, chunk_end, settled)] covering start_date..end_date inclusive
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    settled_until = pd.Timestamp("now").normalize() - pd.Timedelta(days=settle_days)
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        year_end = pd.Timestamp(year=chunk_start.year, month=12, day=31)
+        month_end = chunk_start + pd.offsets.MonthEnd(0)
+        if year_end <= settled_until:
+            chunk_end, settled = year_end, True
+        elif month_end <= settled_until:
+            chunk_end, settled = month_end, True
+        else:
+            chunk_end, settled = end, False
+        chunk_end = min(chunk_end, end)
+        chunks.append((chunk_start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d"), settled))
+        chunk_start = chunk_end + pd.Timedelta(days=1)
+    return chunks
+
+def get_chunk_key(source, city, chunk_start, chunk_end):
+    # content address: endpoint, location, variables, extra params, timezone and date range
+    spec = OPEN_METEO_SOURCES[source]
+    city_info = get_city_info()
+    key = {
+        "url": spec["url"],
+        "lat": city_info[city]["lat"],
+        "lon": city_info[city]["lon"],
+        "variables": spec["variables"],
+        "params": spec["params"],
+        "timezone": get_time_zone(city) if spec["local_time"] else None,
+        "start": chunk_start,
+        "end": chunk_end,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def fetch_open_meteo_history(source, cities, start_date, end_date, client=None, cache_path=OPEN_METEO_CHUNK_CACHE):
+    # same result as fetch_open_meteo over the whole range, but chunked and cached
+    # None when the daily budget ran out first, the chunks fetched so far stay cached for the next run
+    if client is None:
+        client = get_open_meteo_client()
+    cities = list(cities)
+    frames = {city: [] for city in cities}
+    os.makedirs(f"{cache_path}/{source}", exist_ok=True)
+    for chunk_start, chunk_end, settled in get_history_chunks(start_date, end_date):
+        missing = []
+        with telemetry_stage("cache", source=source):
+            for city in cities:
+                chunk_file = f"{cache_path}/{source}/{get_chunk_key(source, city, chunk_start, chunk_end)}.parquet"
+                if settled and os.path.exists(chunk_file):
+                    frames[city].append(pd.read_parquet(chunk_file))
+                else:
+                    missing.append(city)
+        if not missing:
+            continue
+        # cities still missing this chunk go out together in one request
+        try:
+            fetched = fetch_open_meteo(source, missing, chunk_start, chunk_end, client=client)
+        except DailyBudgetExceeded as e:
+            print(f"[{source}] stopped at {chunk_start}: {e}. Fetched chunks are cached, re-run after the reset to continue.")
+            add_metric("budget_stops")
+            return None
+        for city in missing:
+            if settled:
+                chunk_file = f"{cache_path}/{source}/{get_chunk_key(source, city, chunk_start, chunk_end)}.parquet"
+                # write then rename, an interrupted run never leaves a half written chunk behind
+                fetched[city].to_parquet(chunk_file + ".tmp", index=False)
+                os.replace(chunk_file + ".tmp", chunk_file)
+            frames[city].append(fetched[city])
+    return {city: pd.concat(frames[city], ignore_index=True) for city in cities}
+
+def load_OM_data(cities=None):
+    # the chunk cache replaces the http cache here, a whole-range response would never be requested twice
+    openmeteo = get_open_meteo_client(expire_after=requests_cache.DO_NOT_CACHE)
     data_path = "./data"
     # Get city dict
     city_info = get_city_info()
     # city_list
-    city_list = list(city_info.keys())
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    
+    start_date = "1940-01-01"
+    end_date = pd.to_datetime("now") - pd.Timedelta(days=1)
+    end_date = end_date.strftime("%Y-%m-%d")
+    
+    historical_data = fetch_open_meteo_history("OM", city_list, start_date, end_date, client=openmeteo)
+    if historical_data is None:
+        # out of daily budget, the next run continues from the chunk cache
+        return
+    forecast_data = fetch_open_meteo("OM_forecast", city_list, client=openmeteo)
     
     for city in city_list:
         city_file = f"{data_path}/{city}_OM.csv"
-        latitude = city_info[city]["lat"]
-        longitude = city_info[city]["lon"]
-        start_date = "1940-01-01"
-        end_date = pd.to_datetime("now") - pd.Timedelta(days=1)
-        end_date = end_date.strftime("%Y-%m-%d")
-
-        historical_data = get_historical_data(latitude, longitude, start_date, end_date)
-        
-        time.sleep(60)
-        
-        forecast_hourly_data, forecast_daily_data = get_forecast_data(latitude, longitude)
-        
-        combined_daily_data = pd.concat([historical_data, forecast_daily_data], ignore_index=True)
-
-        combined_daily_data.to_csv(city_file, index=False)
-        
-        time.sleep(60)            
-
-def update_OM_data():
-        # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after=-1)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    openmeteo = openmeteo_requests.Client(session=retry_session)
-    
-    def get_historical_data(latitude, longitude, start_date, end_date):
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "start_date": start_date,
-            "end_date": end_date,
-            "daily": ["weather_code", "temperature_2m_max", "temperature_2m_min", "apparent_temperature_max", "apparent_temperature_min", "sunrise", "sunset", "daylight_duration", "sunshine_duration", "precipitation_sum", "rain_sum", "snowfall_sum", "precipitation_hours", "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant", "shortwave_radiation_sum", "et0_fao_evapotranspiration"],
-            "temperature_unit": "fahrenheit"
-        }
-        responses = openmeteo.weather_api(url, params=params)
-        response = responses[0]
-        
-        daily = response.Daily()
-        daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-        daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-        daily_temperature_2m_min = daily.Variables(2).ValuesAsNumpy()
-        daily_apparent_temperature_max = daily.Variables(3).ValuesAsNumpy()
-        daily_apparent_temperature_min = daily.Variables(4).ValuesAsNumpy()
-        daily_sunrise = daily.Variables(5).ValuesAsNumpy()
-        daily_sunset = daily.Variables(6).ValuesAsNumpy()
-        daily_daylight_duration = daily.Variables(7).ValuesAsNumpy()
-        daily_sunshine_duration = daily.Variables(8).ValuesAsNumpy()
-        daily_precipitation_sum = daily.Variables(9).ValuesAsNumpy()
-        daily_rain_sum = daily.Variables(10).ValuesAsNumpy()
-        daily_snowfall_sum = daily.Variables(11).ValuesAsNumpy()
-        daily_precipitation_hours = daily.Variables(12).ValuesAsNumpy()
-        daily_wind_speed_10m_max = daily.Variables(13).ValuesAsNumpy()
-        daily_wind_gusts_10m_max = daily.Variables(14).ValuesAsNumpy()
-        daily_wind_direction_10m_dominant = daily.Variables(15).ValuesAsNumpy()
-        daily_shortwave_radiation_sum = daily.Variables(16).ValuesAsNumpy()
-        daily_et0_fao_evapotranspiration = daily.Variables(17).ValuesAsNumpy()
-        
-        daily_data = {"date": pd.date_range(
-            start = pd.to_datetime(daily.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(daily.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = daily.Interval()),
-            inclusive = "left"
-        )}
-        daily_data["weather_code"] = daily_weather_code
-        daily_data["temperature_2m_max"] = daily_temperature_2m_max
-        daily_data["temperature_2m_min"] = daily_temperature_2m_min
-        daily_data["apparent_temperature_max"] = daily_apparent_temperature_max
-        daily_data["apparent_temperature_min"] = daily_apparent_temperature_min
-        daily_data["sunrise"] = daily_sunrise
-        daily_data["sunset"] = daily_sunset
-        daily_data["daylight_duration"] = daily_daylight_duration
-        daily_data["sunshine_duration"] = daily_sunshine_duration
-        daily_data["precipitation_sum"] = daily_precipitation_sum
-        daily_data["rain_sum"] = daily_rain_sum
-        daily_data["snowfall_sum"] = daily_snowfall_sum
-        daily_data["precipitation_hours"] = daily_precipitation_hours
-        daily_data["wind_speed_10m_max"] = daily_wind_speed_10m_max
-        daily_data["wind_gusts_10m_max"] = daily_wind_gusts_10m_max
-        daily_data["wind_direction_10m_dominant"] = daily_wind_direction_10m_dominant
-        daily_data["shortwave_radiation_sum"] = daily_shortwave_radiation_sum
-        daily_data["et0_fao_evapotranspiration"] = daily_et0_fao_evapotranspiration
-        
-        return pd.DataFrame(data=daily_data)
+        combined_daily_data = pd.concat([historical_data[city], forecast_data[city]], ignore_index=True)
+        # the forecast's past_days=1 repeats yesterday, the last day of the history, keep the forecast's row
+        combined_daily_data = combined_daily_data.drop_duplicates('date', keep='last', ignore_index=True)
+        write_source(city_file, combined_daily_data)
 
-    def get_forecast_data(latitude, longitude):
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "temperature_2m",
-            "daily": ["weather_code", "temperature_2m_max", "temperature_2m_min", "apparent_temperature_max", "apparent_temperature_min", "sunrise", "sunset", "daylight_duration", "sunshine_duration", "precipitation_sum", "rain_sum", "snowfall_sum", "precipitation_hours", "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant", "shortwave_radiation_sum", "et0_fao_evapotranspiration"],
-            "temperature_unit": "fahrenheit",
-            "past_days": 1,
-            "forecast_days": 0
-        }
-        responses = openmeteo.weather_api(url, params=params)
-        response = responses[0]
-        
-        hourly = response.Hourly()
-        hourly_temperature_2m = hourly.Variables(0).ValuesAsNumpy()
-        
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["temperature_2m"] = hourly_temperature_2m
-        
-        hourly_dataframe = pd.DataFrame(data=hourly_data)
-        
-        daily = response.Daily()
-        daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-        daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-        daily_temperature_2m_min = daily.Variables(2).ValuesAsNumpy()
-        daily_apparent_temperature_max = daily.Variables(3).ValuesAsNumpy()
-        daily_apparent_temperature_min = daily.Variables(4).ValuesAsNumpy()
-        daily_sunrise = daily.Variables(5).ValuesAsNumpy()
-        daily_sunset = daily.Variables(6).ValuesAsNumpy()
-        daily_daylight_duration = daily.Variables(7).ValuesAsNumpy()
-        daily_sunshine_duration = daily.Variables(8).ValuesAsNumpy()
-        daily_precipitation_sum = daily.Variables(9).ValuesAsNumpy()
-        daily_rain_sum = daily.Variables(10).ValuesAsNumpy()
-        daily_snowfall_sum = daily.Variables(11).ValuesAsNumpy()
-        daily_precipitation_hours = daily.Variables(12).ValuesAsNumpy()
-        daily_wind_speed_10m_max = daily.Variables(13).ValuesAsNumpy()
-        daily_wind_gusts_10m_max = daily.Variables(14).ValuesAsNumpy()
-        daily_wind_direction_10m_dominant = daily.Variables(15).ValuesAsNumpy()
-        daily_shortwave_radiation_sum = daily.Variables(16).ValuesAsNumpy()
-        daily_et0_fao_evapotranspiration = daily.Variables(17).ValuesAsNumpy()
-        
-        daily_data = {"date": pd.date_range(
-            start = pd.to_datetime(daily.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(daily.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = daily.Interval()),
-            inclusive = "left"
-        )}
-        daily_data["weather_code"] = daily_weather_code
-        daily_data["temperature_2m_max"] = daily_temperature_2m_max
-        daily_data["temperature_2m_min"] = daily_temperature_2m_min
-        daily_data["apparent_temperature_max"] = daily_apparent_temperature_max
-        daily_data["apparent_temperature_min"] = daily_apparent_temperature_min
-        daily_data["sunrise"] = daily_sunrise
-        daily_data["sunset"] = daily_sunset
-        daily_data["daylight_duration"] = daily_daylight_duration
-        daily_data["sunshine_duration"] = daily_sunshine_duration
-        daily_data["precipitation_sum"] = daily_precipitation_sum
-        daily_data["rain_sum"] = daily_rain_sum
-        daily_data["snowfall_sum"] = daily_snowfall_sum
-        daily_data["precipitation_hours"] = daily_precipitation_hours
-        daily_data["wind_speed_10m_max"] = daily_wind_speed_10m_max
-        daily_data["wind_gusts_10m_max"] = daily_wind_gusts_10m_max
-        daily_data["wind_direction_10m_dominant"] = daily_wind_direction_10m_dominant
-        daily_data["shortwave_radiation_sum"] = daily_shortwave_radiation_sum
-        daily_data["et0_fao_evapotranspiration"] = daily_et0_fao_evapotranspiration
-        
-        daily_dataframe = pd.DataFrame(data=daily_data)
-        
-        return hourly_dataframe, daily_dataframe
-
-    # Example usage
+def update_OM_data(cities=None):
+    openmeteo = get_open_meteo_client()
     data_path = "./data"
     # Get city dict
     city_info = get_city_info()
-    # city_list
-    city_list = list(city_info.keys())
+    # city_list (defaults to every city)
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    
+    # one request covers every city, starting from the city that is furthest behind
+    last_dates = {city: get_last_time(f"{data_path}/{city}_OM.csv") for city in city_list}
+    
+    start_date = min(last_dates.values()) + pd.Timedelta(days=1)
+    start_date = start_date.strftime("%Y-%m-%d")
+    
+    end_date = pd.to_datetime("now") - pd.Timedelta(days=1)
+    end_date = end_date.strftime("%Y-%m-%d")
+    
+    # the archive lags by a day, when only yesterday is missing the forecast endpoint covers it
+    historical_data = {}
+    if start_date < end_date:
+        historical_data = fetch_open_meteo("OM", city_list, start_date, end_date, client=openmeteo)
+    forecast_data = fetch_open_meteo("OM_forecast", city_list, client=openmeteo)
     
     for city in city_list:
         city_file = f"{data_path}/{city}_OM.csv"
-        latitude = city_info[city]["lat"]
-        longitude = city_info[city]["lon"]
-        
-        old_df = pd.read_csv(city_file)
-        old_df['date'] = pd.to_datetime(old_df['date'])
-        last_date = old_df['date'].iloc[-1]
-        
-        start_date = last_date + pd.Timedelta(days=1)
-        start_date = start_date.strftime("%Y-%m-%d")
-        
-        end_date = pd.to_datetime("now") - pd.Timedelta(days=1)
-        end_date = end_date.strftime("%Y-%m-%d")
-        
-        if start_date == end_date:
-            forecast_hourly_data, combined_daily_data = get_forecast_data(latitude, longitude)
-        else:
-            historical_data = get_historical_data(latitude, longitude, start_date, end_date)
-        
-            time.sleep(60)
-            
-            forecast_hourly_data, forecast_daily_data = get_forecast_data(latitude, longitude)
-            
-            combined_daily_data = pd.concat([historical_data, forecast_daily_data], ignore_index=True)        
-        
-        combined_daily_data = pd.concat([old_df, combined_daily_data], ignore_index=True)
-            
-        combined_daily_data.to_csv(city_file, index=False)
-                
-        time.sleep(30)
+        frames = [historical_data[city]] if city in historical_data else []
+        combined_daily_data = pd.concat(frames + [forecast_data[city]], ignore_index=True)
+        # yesterday comes from both endpoints, as in load_OM_data
+        combined_daily_data = combined_daily_data.drop_duplicates('date', keep='last', ignore_index=True)
+        combined_daily_data = combined_daily_data[combined_daily_data['date'].dt.tz_convert(None) > last_dates[city]]
+        append_source(city_file, combined_daily_data)
         
 from meteostat import Stations, Daily
 from datetime import datetime
@@ -828,567 +531,373 @@ def load_MS_data():
         # save data
         data.to_csv(f'../data/{key}_MS.csv')
 
-import json
-import requests
+# MesoWest token cache
+# The weather.gov timeseries page only gives us the MesoWest API token, so the browser is started
+# only when the cached token is older than MESOWEST_TOKEN_TTL or the API rejects it.
+MESOWEST_URL = "https://api.mesowest.net/v2/stations/timeseries"
+MESOWEST_TOKEN_CACHE = "./.mesowest_token.json"
+MESOWEST_TOKEN_TTL = 12 * 60 * 60
+token_lock = threading.Lock()
+
+def find_token_in_logs(logs):
+    for entry in logs:
+        message = entry['message']
+        if 'token=' not in message:
+            continue
+        try:
+            url = json.loads(message)['message']['params']['request']['url']
+        except (KeyError, ValueError):
+            continue
+        if 'token=' in url:
+            return url.split('token=')[1].split('&')[0]
+    return None
+
+def scrape_mesowest_token(station_id, timeout=30):
+    url = f"https://www.weather.gov/wrh/timeseries?site={station_id}"
+    with telemetry_stage("token", source="WRH"), get_driver_pool().driver() as driver:
+        # drop log entries left over from the page this driver visited before
+        driver.get_log('performance')
+        driver.get(url)
+        # poll the performance log instead of sleeping a fixed 15 seconds
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            token = find_token_in_logs(driver.get_log('performance'))
+            if token is not None:
+                return token
+            timed_sleep(1)
+    raise RuntimeError(f"No MesoWest token found on {url}")
+
+def get_mesowest_token(station_id, rejected=None, cache_path=MESOWEST_TOKEN_CACHE, ttl=MESOWEST_TOKEN_TTL):
+    with token_lock:
+        if os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            # another thread may already have replaced the token we were told was rejected
+            if time.time() - cached["fetched_at"] < ttl and cached["token"] != rejected:
+                return cached["token"]
+        token = scrape_mesowest_token(station_id)
+        with open(cache_path, "w") as f:
+            json.dump({"token": token, "fetched_at": time.time()}, f)
+        return token
+
+def token_rejected(response):
+    if response.status_code in (401, 403):
+        return True
+    try:
+        summary = response.json().get('SUMMARY', {})
+    except ValueError:
+        return False
+    # Synoptic reports auth failures as RESPONSE_CODE 200 inside a 200 response
+    return summary.get('RESPONSE_CODE') == 200 or 'token' in str(summary.get('RESPONSE_MESSAGE', '')).lower()
+
+def fetch_mesowest_observations(station_id, start, end):
+    token = get_mesowest_token(station_id)
+    for attempt in range(2):
+        params = {
+            "STID": station_id,
+            "showemptystations": 1,
+            "units": "temp|F,speed|mph,english",
+            "start": start,
+            "end": end,
+            "token": token,
+            "complete": 1,
+            "obtimezone": "local",
+        }
+        with telemetry_stage("fetch", source="WRH"):
+            response = get_http_session().get(MESOWEST_URL, params=params)
+        if token_rejected(response):
+            add_metric("retries")
+            token = get_mesowest_token(station_id, rejected=token)
+            continue
+        response.raise_for_status()
+        data = response.json()
+        # windows with no observations come back without a STATION entry
+        if not data.get('STATION'):
+            return {}
+        return data['STATION'][0]['OBSERVATIONS']
+    raise RuntimeError(f"MesoWest rejected a freshly scraped token for {station_id}")
+        
+def load_WRH_data(cities=None):
+    # full reload goes through the windowed backfill so the whole history never sits in memory at once
+    backfill_WRH_data(cities=cities)
         
-def load_WRH_data():
+def update_WRH_data(cities=None):
     data_path = "./data"
     # Get city dict
     city_info = get_city_info()
-    # city_list
-    city_list = list(city_info.keys())
+    # city_list (defaults to every city, the orchestrator passes a single one)
+    city_list = list(city_info.keys()) if cities is None else list(cities)
     for city in city_list:
         city_file = f"{data_path}/{city}_WRH.csv"
         city_station_id = city_info[city]["station"]
-        url = f"https://www.weather.gov/wrh/timeseries?site={city_station_id}"
-        driver = get_webdriver()
-        driver.get(url)
-        time.sleep(15)
-        logs = driver.get_log('performance')
-        urls = []
-        for entry in logs:
-            message = entry['message']
-            if 'token' in message.lower():
-                entry = json.loads(message)
-                try:
-                    url = entry['message']['params']['request']['url']
-                except:
-                    continue
-                urls.append(url)
-        # extract the token from the url
-        token = urls[0].split('token=')[1].split('&')[0]
-        start = '200207140000'
+        timezone = get_time_zone(city)
+        # Only the last timestamp of the existing data is needed
+        last_date = get_last_time(city_file)
+        start = last_date.tz_convert(timezone).strftime("%Y%m%d") + '0000'
         # end date is today
         end = pd.to_datetime("now").strftime("%Y%m%d%H%M")
-        url_form = f'https://api.mesowest.net/v2/stations/timeseries?STID={city_station_id}&showemptystations=1&units=temp|F,speed|mph,english&start={start}&end={end}&token={token}&complete=1&obtimezone=local'
-        response = requests.get(url_form)
-        data = response.json()
-        observations = data['STATION'][0]['OBSERVATIONS']
-        df = pd.DataFrame(observations)
-        df.to_csv(city_file, index=False)
-        driver.quit()
-        
-def update_WRH_data():
+        observations = fetch_mesowest_observations(city_station_id, start, end)
+        if not observations:
+            # nothing reported since the last update, same as an empty window in the backfill
+            print(f"{city}: no new WRH observations")
+            continue
+        with telemetry_stage("parse", source="WRH"):
+            df = pd.DataFrame(observations)
+            df['date_time'] = parse_times(df['date_time'])
+        new_df = df[df['date_time'] > last_date]
+        # new_df must not include today's data (only compare the local date part)
+        today = pd.to_datetime("now").date()
+        new_df = new_df[new_df['date_time'].dt.tz_convert(timezone).dt.date < today]
+        append_source(city_file, new_df)
+        
+# WRH backfill
+# Asking for every 5-minute observation since 2002 in one request keeps 20+ years of rows in memory.
+# The backfill splits the range into fixed windows, fetches a few at a time and writes each finished
+# window to its own part file. A re-run skips windows whose part already exists, then the parts are
+# stitched into the city file one at a time, so memory stays around one window per worker.
+WRH_BACKFILL_START = '200207140000'
+
+def get_backfill_windows(start, end, window_days):
+    # windows are anchored on start, so every run produces the same boundaries (only the last one grows)
+    windows = []
+    for window_start in pd.date_range(start, end, freq=f"{window_days}D"):
+        window_end = min(window_start + pd.Timedelta(days=window_days) - pd.Timedelta(minutes=1), end)
+        windows.append((window_start.strftime("%Y%m%d%H%M"), window_end.strftime("%Y%m%d%H%M")))
+    return windows
+
+def fetch_WRH_window(station_id, window_start, window_end, part_file):
+    observations = fetch_mesowest_observations(station_id, window_start, window_end)
+    df = pd.DataFrame(observations)
+    # write to a temp file first so a crash never leaves a half written part behind
+    with telemetry_stage("write", source="WRH"):
+        add_metric("rows", len(df))
+        tmp_file = part_file + '.tmp'
+        if df.empty:
+            open(tmp_file, 'w').close()
+        else:
+            df.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, part_file)
+    return len(df)
+
+def stitch_WRH_parts(part_files, city_file):
+    part_files = [part for part in part_files if os.path.getsize(part) > 0]
+    if not part_files:
+        # every window came back empty, keep whatever the city file had
+        print(f"No WRH observations in any window, {city_file} left as it was")
+        return
+    # sensors come and go over the years, so use the union of every part's header
+    columns = []
+    for part in part_files:
+        for column in pd.read_csv(part, nrows=0).columns:
+            if column not in columns:
+                columns.append(column)
+    tmp_file = city_file + '.tmp'
+    first = True
+    for part in part_files:
+        df = pd.read_csv(part).reindex(columns=columns)
+        df.to_csv(tmp_file, mode='w' if first else 'a', header=first, index=False)
+        first = False
+    os.replace(tmp_file, city_file)
+
+def backfill_WRH_data(cities=None, start=WRH_BACKFILL_START, window_days=30, max_workers=4):
     data_path = "./data"
     # Get city dict
     city_info = get_city_info()
-    # city_list
-    city_list = list(city_info.keys())
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    end = pd.to_datetime("now").floor("min")
+    windows = get_backfill_windows(pd.to_datetime(start, format="%Y%m%d%H%M"), end, window_days)
+    
     for city in city_list:
         city_file = f"{data_path}/{city}_WRH.csv"
         city_station_id = city_info[city]["station"]
-        url = f"https://www.weather.gov/wrh/timeseries?site={city_station_id}"
-        driver = get_webdriver()
-        driver.get(url)
-        time.sleep(15)
-        logs = driver.get_log('performance')
-        urls = []
-        for entry in logs:
-            message = entry['message']
-            if 'token' in message.lower():
-                entry = json.loads(message)
+        parts_path = f"{data_path}/{city}_WRH_parts"
+        os.makedirs(parts_path, exist_ok=True)
+        part_files = [f"{parts_path}/{window_start}_{window_end}.csv" for window_start, window_end in windows]
+        
+        # the last window is refetched every run since its end moves, finished windows are reused
+        todo = [(window, part) for window, part in zip(windows, part_files)
+                if not os.path.exists(part) or part == part_files[-1]]
+        print(f"{city}: {len(windows) - len(todo)}/{len(windows)} WRH windows already downloaded")
+        
+        failures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_WRH_window, city_station_id, window_start, window_end, part): part
+                       for (window_start, window_end), part in todo}
+            for future in as_completed(futures):
                 try:
-                    url = entry['message']['params']['request']['url']
-                except:
-                    continue
-                urls.append(url)
-        # extract the token from the url
-        token = urls[0].split('token=')[1].split('&')[0]
-        # Load the existing data
-        old_df = pd.read_csv(city_file)
-        old_df['date_time'] = pd.to_datetime(old_df['date_time'])
-        start = old_df['date_time'].iloc[-1].strftime("%Y%m%d") + '0000'
-        # end date is today
-        end = pd.to_datetime("now").strftime("%Y%m%d%H%M")
-        url_form = f'https://api.mesowest.net/v2/stations/timeseries?STID={city_station_id}&showemptystations=1&units=temp|F,speed|mph,english&start={start}&end={end}&token={token}&complete=1&obtimezone=local'
-        response = requests.get(url_form)
-        data = response.json()
-        observations = data['STATION'][0]['OBSERVATIONS']
-        df = pd.DataFrame(observations)
-        df['date_time'] = pd.to_datetime(df['date_time'])
-        last_date = old_df['date_time'].iloc[-1]
-        new_df = df[df['date_time'] > last_date]
-        # new_df must not include today's data (only compare the date part)
-        today = pd.to_datetime("now").date()
-        new_df = new_df[new_df['date_time'].dt.date < today]        
-        new_df = pd.concat([old_df, new_df], ignore_index=True)   
-        new_df.to_csv(city_file, index=False)
-        driver.quit()
-        
-def get_Solar_Soil_data():
-    # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after = -1)
-    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
-    
-    url = "https://archive-api.open-meteo.com/v1/archive"
-
-    def get_historical_data(lat, long, start, end, tz):
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": lat,
-            "longitude": long,
-            "start_date": start,
-            "end_date": end,
-            "hourly": ["soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm", "soil_temperature_100_to_255cm", "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm", "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm", "shortwave_radiation", "direct_radiation", "diffuse_radiation", "direct_normal_irradiance", "global_tilted_irradiance", "terrestrial_radiation", "shortwave_radiation_instant", "direct_radiation_instant", "diffuse_radiation_instant", "direct_normal_irradiance_instant", "global_tilted_irradiance_instant", "terrestrial_radiation_instant"],
-            "timezone": tz
-        }
-        responses = openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
-
-        # Process hourly data. The order of variables needs to be the same as requested.
-        hourly = response.Hourly()
-        hourly_soil_temperature_0_to_7cm = hourly.Variables(0).ValuesAsNumpy()
-        hourly_soil_temperature_7_to_28cm = hourly.Variables(1).ValuesAsNumpy()
-        hourly_soil_temperature_28_to_100cm = hourly.Variables(2).ValuesAsNumpy()
-        hourly_soil_temperature_100_to_255cm = hourly.Variables(3).ValuesAsNumpy()
-        hourly_soil_moisture_0_to_7cm = hourly.Variables(4).ValuesAsNumpy()
-        hourly_soil_moisture_7_to_28cm = hourly.Variables(5).ValuesAsNumpy()
-        hourly_soil_moisture_28_to_100cm = hourly.Variables(6).ValuesAsNumpy()
-        hourly_soil_moisture_100_to_255cm = hourly.Variables(7).ValuesAsNumpy()
-        hourly_shortwave_radiation = hourly.Variables(8).ValuesAsNumpy()
-        hourly_direct_radiation = hourly.Variables(9).ValuesAsNumpy()
-        hourly_diffuse_radiation = hourly.Variables(10).ValuesAsNumpy()
-        hourly_direct_normal_irradiance = hourly.Variables(11).ValuesAsNumpy()
-        hourly_global_tilted_irradiance = hourly.Variables(12).ValuesAsNumpy()
-        hourly_terrestrial_radiation = hourly.Variables(13).ValuesAsNumpy()
-        hourly_shortwave_radiation_instant = hourly.Variables(14).ValuesAsNumpy()
-        hourly_direct_radiation_instant = hourly.Variables(15).ValuesAsNumpy()
-        hourly_diffuse_radiation_instant = hourly.Variables(16).ValuesAsNumpy()
-        hourly_direct_normal_irradiance_instant = hourly.Variables(17).ValuesAsNumpy()
-        hourly_global_tilted_irradiance_instant = hourly.Variables(18).ValuesAsNumpy()
-        hourly_terrestrial_radiation_instant = hourly.Variables(19).ValuesAsNumpy()
-
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["soil_temperature_0_to_7cm"] = hourly_soil_temperature_0_to_7cm
-        hourly_data["soil_temperature_7_to_28cm"] = hourly_soil_temperature_7_to_28cm
-        hourly_data["soil_temperature_28_to_100cm"] = hourly_soil_temperature_28_to_100cm
-        hourly_data["soil_temperature_100_to_255cm"] = hourly_soil_temperature_100_to_255cm
-        hourly_data["soil_moisture_0_to_7cm"] = hourly_soil_moisture_0_to_7cm
-        hourly_data["soil_moisture_7_to_28cm"] = hourly_soil_moisture_7_to_28cm
-        hourly_data["soil_moisture_28_to_100cm"] = hourly_soil_moisture_28_to_100cm
-        hourly_data["soil_moisture_100_to_255cm"] = hourly_soil_moisture_100_to_255cm
-        hourly_data["shortwave_radiation"] = hourly_shortwave_radiation
-        hourly_data["direct_radiation"] = hourly_direct_radiation
-        hourly_data["diffuse_radiation"] = hourly_diffuse_radiation
-        hourly_data["direct_normal_irradiance"] = hourly_direct_normal_irradiance
-        hourly_data["global_tilted_irradiance"] = hourly_global_tilted_irradiance
-        hourly_data["terrestrial_radiation"] = hourly_terrestrial_radiation
-        hourly_data["shortwave_radiation_instant"] = hourly_shortwave_radiation_instant
-        hourly_data["direct_radiation_instant"] = hourly_direct_radiation_instant
-        hourly_data["diffuse_radiation_instant"] = hourly_diffuse_radiation_instant
-        hourly_data["direct_normal_irradiance_instant"] = hourly_direct_normal_irradiance_instant
-        hourly_data["global_tilted_irradiance_instant"] = hourly_global_tilted_irradiance_instant
-        hourly_data["terrestrial_radiation_instant"] = hourly_terrestrial_radiation_instant
-
-        hourly_dataframe = pd.DataFrame(data = hourly_data)
-        return hourly_dataframe
-
+                    future.result()
+                except Exception as e:
+                    failures.append((futures[future], e))
+        if failures:
+            raise RuntimeError(f"{len(failures)} WRH windows failed for {city}, re-run to resume: {failures[0][1]}")
+        
+        # clean up parts from older runs whose last window had a different end
+        for name in os.listdir(parts_path):
+            part = f"{parts_path}/{name}"
+            if part not in part_files:
+                os.remove(part)
+        stitch_WRH_parts(part_files, city_file)
+        if store_exists("WRH", city):
+            migrate_csv_to_store(city_file)
+        
+def get_Solar_Soil_data(cities=None):
+    # backfilled through the chunk cache, see fetch_open_meteo_history
+    openmeteo = get_open_meteo_client(expire_after = requests_cache.DO_NOT_CACHE)
     # Get city dict
     city_info = get_city_info()
     
     # city_list
-    city_list = list(city_info.keys())
+    city_list = list(city_info.keys()) if cities is None else list(cities)
     
+    start_date = "2002-08-14"
+    end_date = pd.to_datetime("now") - pd.Timedelta(days = 1)
+    end_date = end_date.strftime("%Y-%m-%d")
+    data = fetch_open_meteo_history("Solar_Soil", city_list, start_date, end_date, client=openmeteo)
+    if data is None:
+        return
     for city in city_list:
-        city_file = f"./data/{city}_Solar_Soil.csv"
-        latitude = city_info[city]["lat"]
-        longitude = city_info[city]["lon"]
-        timezone = get_time_zone(city)
-        start_date = "2002-08-14"
-        end_date = pd.to_datetime("now") - pd.Timedelta(days = 1)
-        end_date = end_date.strftime("%Y-%m-%d")
-        df = get_historical_data(latitude, longitude, start_date, end_date, timezone)
-        df.to_csv(city_file, index = False)
-        time.sleep(60)
-        
-def get_Air_Quality_data():
-    # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after = 3600)
-    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
-
-    def get_historical_data(lat, long, start, end, tz):
-        url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-        params = {
-            "latitude": lat,
-            "longitude": long,
-            "hourly": ["pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "sulphur_dioxide", "ozone", "aerosol_optical_depth", "dust", "uv_index", "uv_index_clear_sky", "ammonia", "alder_pollen", "birch_pollen", "grass_pollen", "mugwort_pollen", "olive_pollen", "ragweed_pollen", "us_aqi", "us_aqi_pm2_5", "us_aqi_pm10", "us_aqi_nitrogen_dioxide", "us_aqi_carbon_monoxide", "us_aqi_ozone", "us_aqi_sulphur_dioxide"],
-            "start_date": start,
-            "end_date": end,
-            "timezone": tz
-        }
-        responses = openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
-
-        # Process hourly data. The order of variables needs to be the same as requested.
-        hourly = response.Hourly()
-        hourly_pm10 = hourly.Variables(0).ValuesAsNumpy()
-        hourly_pm2_5 = hourly.Variables(1).ValuesAsNumpy()
-        hourly_carbon_monoxide = hourly.Variables(2).ValuesAsNumpy()
-        hourly_nitrogen_dioxide = hourly.Variables(3).ValuesAsNumpy()
-        hourly_sulphur_dioxide = hourly.Variables(4).ValuesAsNumpy()
-        hourly_ozone = hourly.Variables(5).ValuesAsNumpy()
-        hourly_aerosol_optical_depth = hourly.Variables(6).ValuesAsNumpy()
-        hourly_dust = hourly.Variables(7).ValuesAsNumpy()
-        hourly_uv_index = hourly.Variables(8).ValuesAsNumpy()
-        hourly_uv_index_clear_sky = hourly.Variables(9).ValuesAsNumpy()
-        hourly_ammonia = hourly.Variables(10).ValuesAsNumpy()
-        hourly_alder_pollen = hourly.Variables(11).ValuesAsNumpy()
-        hourly_birch_pollen = hourly.Variables(12).ValuesAsNumpy()
-        hourly_grass_pollen = hourly.Variables(13).ValuesAsNumpy()
-        hourly_mugwort_pollen = hourly.Variables(14).ValuesAsNumpy()
-        hourly_olive_pollen = hourly.Variables(15).ValuesAsNumpy()
-        hourly_ragweed_pollen = hourly.Variables(16).ValuesAsNumpy()
-        hourly_us_aqi = hourly.Variables(17).ValuesAsNumpy()
-        hourly_us_aqi_pm2_5 = hourly.Variables(18).ValuesAsNumpy()
-        hourly_us_aqi_pm10 = hourly.Variables(19).ValuesAsNumpy()
-        hourly_us_aqi_nitrogen_dioxide = hourly.Variables(20).ValuesAsNumpy()
-        hourly_us_aqi_carbon_monoxide = hourly.Variables(21).ValuesAsNumpy()
-        hourly_us_aqi_ozone = hourly.Variables(22).ValuesAsNumpy()
-        hourly_us_aqi_sulphur_dioxide = hourly.Variables(23).ValuesAsNumpy()
-
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["pm10"] = hourly_pm10
-        hourly_data["pm2_5"] = hourly_pm2_5
-        hourly_data["carbon_monoxide"] = hourly_carbon_monoxide
-        hourly_data["nitrogen_dioxide"] = hourly_nitrogen_dioxide
-        hourly_data["sulphur_dioxide"] = hourly_sulphur_dioxide
-        hourly_data["ozone"] = hourly_ozone
-        hourly_data["aerosol_optical_depth"] = hourly_aerosol_optical_depth
-        hourly_data["dust"] = hourly_dust
-        hourly_data["uv_index"] = hourly_uv_index
-        hourly_data["uv_index_clear_sky"] = hourly_uv_index_clear_sky
-        hourly_data["ammonia"] = hourly_ammonia
-        hourly_data["alder_pollen"] = hourly_alder_pollen
-        hourly_data["birch_pollen"] = hourly_birch_pollen
-        hourly_data["grass_pollen"] = hourly_grass_pollen
-        hourly_data["mugwort_pollen"] = hourly_mugwort_pollen
-        hourly_data["olive_pollen"] = hourly_olive_pollen
-        hourly_data["ragweed_pollen"] = hourly_ragweed_pollen
-        hourly_data["us_aqi"] = hourly_us_aqi
-        hourly_data["us_aqi_pm2_5"] = hourly_us_aqi_pm2_5
-        hourly_data["us_aqi_pm10"] = hourly_us_aqi_pm10
-        hourly_data["us_aqi_nitrogen_dioxide"] = hourly_us_aqi_nitrogen_dioxide
-        hourly_data["us_aqi_carbon_monoxide"] = hourly_us_aqi_carbon_monoxide
-        hourly_data["us_aqi_ozone"] = hourly_us_aqi_ozone
-        hourly_data["us_aqi_sulphur_dioxide"] = hourly_us_aqi_sulphur_dioxide
-
-        hourly_dataframe = pd.DataFrame(data = hourly_data)
+        write_source(f"./data/{city}_Solar_Soil.csv", data[city])
         
-        return hourly_dataframe
-
+def get_Air_Quality_data(cities=None):
+    # backfilled through the chunk cache, see fetch_open_meteo_history
+    openmeteo = get_open_meteo_client(expire_after = requests_cache.DO_NOT_CACHE)
     # Get city dict
     city_info = get_city_info()
     
     # city_list
-    city_list = list(city_info.keys())
+    city_list = list(city_info.keys()) if cities is None else list(cities)
     
+    start_date = "2022-07-29"
+    end_date = pd.to_datetime("now") - pd.Timedelta(days = 1)
+    end_date = end_date.strftime("%Y-%m-%d")
+    data = fetch_open_meteo_history("Air_Quality", city_list, start_date, end_date, client=openmeteo)
+    if data is None:
+        return
     for city in city_list:
-        city_file = f"./data/{city}_Air_Quality.csv"
-        latitude = city_info[city]["lat"]
-        longitude = city_info[city]["lon"]
-        timezone = get_time_zone(city)
-        start_date = "2022-07-29"
-        end_date = pd.to_datetime("now") - pd.Timedelta(days = 1)
-        end_date = end_date.strftime("%Y-%m-%d")
-        df = get_historical_data(latitude, longitude, start_date, end_date, timezone)
-        df.to_csv(city_file, index = False)
-        time.sleep(60)
-        
-def update_Solar_Soil_data():
-    # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after = -1)
-    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
-
-    def get_historical_data(lat, long, start, end, tz):
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": lat,
-            "longitude": long,
-            "start_date": start,
-            "end_date": end,
-            "hourly": ["soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm", "soil_temperature_100_to_255cm", "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm", "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm", "shortwave_radiation", "direct_radiation", "diffuse_radiation", "direct_normal_irradiance", "global_tilted_irradiance", "terrestrial_radiation", "shortwave_radiation_instant", "direct_radiation_instant", "diffuse_radiation_instant", "direct_normal_irradiance_instant", "global_tilted_irradiance_instant", "terrestrial_radiation_instant"],
-            "timezone": tz
-        }
-        responses = openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
-
-        # Process hourly data. The order of variables needs to be the same as requested.
-        hourly = response.Hourly()
-        hourly_soil_temperature_0_to_7cm = hourly.Variables(0).ValuesAsNumpy()
-        hourly_soil_temperature_7_to_28cm = hourly.Variables(1).ValuesAsNumpy()
-        hourly_soil_temperature_28_to_100cm = hourly.Variables(2).ValuesAsNumpy()
-        hourly_soil_temperature_100_to_255cm = hourly.Variables(3).ValuesAsNumpy()
-        hourly_soil_moisture_0_to_7cm = hourly.Variables(4).ValuesAsNumpy()
-        hourly_soil_moisture_7_to_28cm = hourly.Variables(5).ValuesAsNumpy()
-        hourly_soil_moisture_28_to_100cm = hourly.Variables(6).ValuesAsNumpy()
-        hourly_soil_moisture_100_to_255cm = hourly.Variables(7).ValuesAsNumpy()
-        hourly_shortwave_radiation = hourly.Variables(8).ValuesAsNumpy()
-        hourly_direct_radiation = hourly.Variables(9).ValuesAsNumpy()
-        hourly_diffuse_radiation = hourly.Variables(10).ValuesAsNumpy()
-        hourly_direct_normal_irradiance = hourly.Variables(11).ValuesAsNumpy()
-        hourly_global_tilted_irradiance = hourly.Variables(12).ValuesAsNumpy()
-        hourly_terrestrial_radiation = hourly.Variables(13).ValuesAsNumpy()
-        hourly_shortwave_radiation_instant = hourly.Variables(14).ValuesAsNumpy()
-        hourly_direct_radiation_instant = hourly.Variables(15).ValuesAsNumpy()
-        hourly_diffuse_radiation_instant = hourly.Variables(16).ValuesAsNumpy()
-        hourly_direct_normal_irradiance_instant = hourly.Variables(17).ValuesAsNumpy()
-        hourly_global_tilted_irradiance_instant = hourly.Variables(18).ValuesAsNumpy()
-        hourly_terrestrial_radiation_instant = hourly.Variables(19).ValuesAsNumpy()
-
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["soil_temperature_0_to_7cm"] = hourly_soil_temperature_0_to_7cm
-        hourly_data["soil_temperature_7_to_28cm"] = hourly_soil_temperature_7_to_28cm
-        hourly_data["soil_temperature_28_to_100cm"] = hourly_soil_temperature_28_to_100cm
-        hourly_data["soil_temperature_100_to_255cm"] = hourly_soil_temperature_100_to_255cm
-        hourly_data["soil_moisture_0_to_7cm"] = hourly_soil_moisture_0_to_7cm
-        hourly_data["soil_moisture_7_to_28cm"] = hourly_soil_moisture_7_to_28cm
-        hourly_data["soil_moisture_28_to_100cm"] = hourly_soil_moisture_28_to_100cm
-        hourly_data["soil_moisture_100_to_255cm"] = hourly_soil_moisture_100_to_255cm
-        hourly_data["shortwave_radiation"] = hourly_shortwave_radiation
-        hourly_data["direct_radiation"] = hourly_direct_radiation
-        hourly_data["diffuse_radiation"] = hourly_diffuse_radiation
-        hourly_data["direct_normal_irradiance"] = hourly_direct_normal_irradiance
-        hourly_data["global_tilted_irradiance"] = hourly_global_tilted_irradiance
-        hourly_data["terrestrial_radiation"] = hourly_terrestrial_radiation
-        hourly_data["shortwave_radiation_instant"] = hourly_shortwave_radiation_instant
-        hourly_data["direct_radiation_instant"] = hourly_direct_radiation_instant
-        hourly_data["diffuse_radiation_instant"] = hourly_diffuse_radiation_instant
-        hourly_data["direct_normal_irradiance_instant"] = hourly_direct_normal_irradiance_instant
-        hourly_data["global_tilted_irradiance_instant"] = hourly_global_tilted_irradiance_instant
-        hourly_data["terrestrial_radiation_instant"] = hourly_terrestrial_radiation_instant
-
-        hourly_dataframe = pd.DataFrame(data = hourly_data)
-        return hourly_dataframe
-
-    def get_forecast(latitude, longitude, past):
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": ["soil_temperature_0cm", "soil_temperature_6cm", "soil_temperature_18cm", "soil_temperature_54cm", "soil_moisture_0_to_1cm", "soil_moisture_1_to_3cm", "soil_moisture_3_to_9cm", "soil_moisture_9_to_27cm", "soil_moisture_27_to_81cm", "shortwave_radiation", "direct_radiation", "diffuse_radiation", "direct_normal_irradiance", "global_tilted_irradiance", "terrestrial_radiation", "shortwave_radiation_instant", "direct_radiation_instant", "diffuse_radiation_instant", "direct_normal_irradiance_instant", "global_tilted_irradiance_instant", "terrestrial_radiation_instant"],
-            "past_days": past
-        }
-        responses = openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
-
-        # Process hourly data. The order of variables needs to be the same as requested.
-        hourly = response.Hourly()
-        hourly_soil_temperature_0cm = hourly.Variables(0).ValuesAsNumpy()
-        hourly_soil_temperature_6cm = hourly.Variables(1).ValuesAsNumpy()
-        hourly_soil_temperature_18cm = hourly.Variables(2).ValuesAsNumpy()
-        hourly_soil_temperature_54cm = hourly.Variables(3).ValuesAsNumpy()
-        hourly_soil_moisture_0_to_1cm = hourly.Variables(4).ValuesAsNumpy()
-        hourly_soil_moisture_1_to_3cm = hourly.Variables(5).ValuesAsNumpy()
-        hourly_soil_moisture_3_to_9cm = hourly.Variables(6).ValuesAsNumpy()
-        hourly_soil_moisture_9_to_27cm = hourly.Variables(7).ValuesAsNumpy()
-        hourly_soil_moisture_27_to_81cm = hourly.Variables(8).ValuesAsNumpy()
-        hourly_shortwave_radiation = hourly.Variables(9).ValuesAsNumpy()
-        hourly_direct_radiation = hourly.Variables(10).ValuesAsNumpy()
-        hourly_diffuse_radiation = hourly.Variables(11).ValuesAsNumpy()
-        hourly_direct_normal_irradiance = hourly.Variables(12).ValuesAsNumpy()
-        hourly_global_tilted_irradiance = hourly.Variables(13).ValuesAsNumpy()
-        hourly_terrestrial_radiation = hourly.Variables(14).ValuesAsNumpy()
-        hourly_shortwave_radiation_instant = hourly.Variables(15).ValuesAsNumpy()
-        hourly_direct_radiation_instant = hourly.Variables(16).ValuesAsNumpy()
-        hourly_diffuse_radiation_instant = hourly.Variables(17).ValuesAsNumpy()
-        hourly_direct_normal_irradiance_instant = hourly.Variables(18).ValuesAsNumpy()
-        hourly_global_tilted_irradiance_instant = hourly.Variables(19).ValuesAsNumpy()
-        hourly_terrestrial_radiation_instant = hourly.Variables(20).ValuesAsNumpy()
-
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["soil_temperature_0cm"] = hourly_soil_temperature_0cm
-        hourly_data["soil_temperature_6cm"] = hourly_soil_temperature_6cm
-        hourly_data["soil_temperature_18cm"] = hourly_soil_temperature_18cm
-        hourly_data["soil_temperature_54cm"] = hourly_soil_temperature_54cm
-        hourly_data["soil_moisture_0_to_1cm"] = hourly_soil_moisture_0_to_1cm
-        hourly_data["soil_moisture_1_to_3cm"] = hourly_soil_moisture_1_to_3cm
-        hourly_data["soil_moisture_3_to_9cm"] = hourly_soil_moisture_3_to_9cm
-        hourly_data["soil_moisture_9_to_27cm"] = hourly_soil_moisture_9_to_27cm
-        hourly_data["soil_moisture_27_to_81cm"] = hourly_soil_moisture_27_to_81cm
-        hourly_data["shortwave_radiation"] = hourly_shortwave_radiation
-        hourly_data["direct_radiation"] = hourly_direct_radiation
-        hourly_data["diffuse_radiation"] = hourly_diffuse_radiation
-        hourly_data["direct_normal_irradiance"] = hourly_direct_normal_irradiance
-        hourly_data["global_tilted_irradiance"] = hourly_global_tilted_irradiance
-        hourly_data["terrestrial_radiation"] = hourly_terrestrial_radiation
-        hourly_data["shortwave_radiation_instant"] = hourly_shortwave_radiation_instant
-        hourly_data["direct_radiation_instant"] = hourly_direct_radiation_instant
-        hourly_data["diffuse_radiation_instant"] = hourly_diffuse_radiation_instant
-        hourly_data["direct_normal_irradiance_instant"] = hourly_direct_normal_irradiance_instant
-        hourly_data["global_tilted_irradiance_instant"] = hourly_global_tilted_irradiance_instant
-        hourly_data["terrestrial_radiation_instant"] = hourly_terrestrial_radiation_instant
-
-        hourly_dataframe = pd.DataFrame(data = hourly_data)
-        return hourly_dataframe
+        write_source(f"./data/{city}_Air_Quality.csv", data[city])
 
+def update_hourly_open_meteo(source, cities=None):
+    # shared by the Solar_Soil and Air_Quality updates: one request for every city, then per-city filtering
+    openmeteo = get_open_meteo_client()
     # Get city dict
     city_info = get_city_info()
     
-    # city_list
-    city_list = list(city_info.keys())
+    # city_list (defaults to every city)
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    
+    last_dates = {city: get_last_time(f"./data/{city}_{source}.csv") for city in city_list}
+    
+    # start from the local date of the city that is furthest behind
+    start = min(last_dates[city].tz_convert(get_time_zone(city)).date() for city in city_list)
+    
+    end = pd.to_datetime("now").date()
+    
+    data = fetch_open_meteo(source, city_list, start, end, client=openmeteo)
     
     for city in city_list:
-        city_file = f"./data/{city}_Solar_Soil.csv"
-        latitude = city_info[city]["lat"]
-        longitude = city_info[city]["lon"]
         timezone = get_time_zone(city)
-        old_df = pd.read_csv(city_file)
-        old_df["date"] = pd.to_datetime(old_df["date"])
-        
-        start = old_df["date"].max().date()
-        
-        end = pd.to_datetime("now").date()
-        
-        day_diff = (end - start).days
-        
-        new_df = get_historical_data(latitude, longitude, start, end, timezone)
-        new_df['date'] = pd.to_datetime(new_df['date'])
+        new_df = data[city]
         new_df["date"] = new_df["date"].dt.tz_convert(timezone)
         
-        last_date = old_df['date'].iloc[-1]
-        new_df = new_df[new_df['date'] > last_date]
+        new_df = new_df[new_df['date'] > last_dates[city]]
         new_df = new_df[new_df['date'].dt.date < end]
-        new_df = pd.concat([old_df, new_df], ignore_index=True)
-        new_df.to_csv(city_file, index=False)
-        time.sleep(60)
-
-def update_Air_Quality_data():
-    cache_session = requests_cache.CachedSession('.cache', expire_after = -1)
-    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
+        append_source(f"./data/{city}_{source}.csv", new_df)
 
-    def get_historical_data(lat, long, start, end, tz):
-        url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-        params = {
-            "latitude": lat,
-            "longitude": long,
-            "hourly": ["pm10", "pm2_5", "carbon_monoxide", "nitrogen_dioxide", "sulphur_dioxide", "ozone", "aerosol_optical_depth", "dust", "uv_index", "uv_index_clear_sky", "ammonia", "alder_pollen", "birch_pollen", "grass_pollen", "mugwort_pollen", "olive_pollen", "ragweed_pollen", "us_aqi", "us_aqi_pm2_5", "us_aqi_pm10", "us_aqi_nitrogen_dioxide", "us_aqi_carbon_monoxide", "us_aqi_ozone", "us_aqi_sulphur_dioxide"],
-            "timezone": tz,
-            "start_date": start,
-            "end_date": end
-        }
-        responses = openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
-        hourly = response.Hourly()
-        hourly_pm10 = hourly.Variables(0).ValuesAsNumpy()
-        hourly_pm2_5 = hourly.Variables(1).ValuesAsNumpy()
-        hourly_carbon_monoxide = hourly.Variables(2).ValuesAsNumpy()
-        hourly_nitrogen_dioxide = hourly.Variables(3).ValuesAsNumpy()
-        hourly_sulphur_dioxide = hourly.Variables(4).ValuesAsNumpy()
-        hourly_ozone = hourly.Variables(5).ValuesAsNumpy()
-        hourly_aerosol_optical_depth = hourly.Variables(6).ValuesAsNumpy()
-        hourly_dust = hourly.Variables(7).ValuesAsNumpy()
-        hourly_uv_index = hourly.Variables(8).ValuesAsNumpy()
-        hourly_uv_index_clear_sky = hourly.Variables(9).ValuesAsNumpy()
-        hourly_ammonia = hourly.Variables(10).ValuesAsNumpy()
-        hourly_alder_pollen = hourly.Variables(11).ValuesAsNumpy()
-        hourly_birch_pollen = hourly.Variables(12).ValuesAsNumpy()
-        hourly_grass_pollen = hourly.Variables(13).ValuesAsNumpy()
-        hourly_mugwort_pollen = hourly.Variables(14).ValuesAsNumpy()
-        hourly_olive_pollen = hourly.Variables(15).ValuesAsNumpy()
-        hourly_ragweed_pollen = hourly.Variables(16).ValuesAsNumpy()
-        hourly_us_aqi = hourly.Variables(17).ValuesAsNumpy()
-        hourly_us_aqi_pm2_5 = hourly.Variables(18).ValuesAsNumpy()
-        hourly_us_aqi_pm10 = hourly.Variables(19).ValuesAsNumpy()
-        hourly_us_aqi_nitrogen_dioxide = hourly.Variables(20).ValuesAsNumpy()
-        hourly_us_aqi_carbon_monoxide = hourly.Variables(21).ValuesAsNumpy()
-        hourly_us_aqi_ozone = hourly.Variables(22).ValuesAsNumpy()
-        hourly_us_aqi_sulphur_dioxide = hourly.Variables(23).ValuesAsNumpy()
-
-        hourly_data = {"date": pd.date_range(
-            start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-            end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-            freq = pd.Timedelta(seconds = hourly.Interval()),
-            inclusive = "left"
-        )}
-        hourly_data["pm10"] = hourly_pm10
-        hourly_data["pm2_5"] = hourly_pm2_5
-        hourly_data["carbon_monoxide"] = hourly_carbon_monoxide
-        hourly_data["nitrogen_dioxide"] = hourly_nitrogen_dioxide
-        hourly_data["sulphur_dioxide"] = hourly_sulphur_dioxide
-        hourly_data["ozone"] = hourly_ozone
-        hourly_data["aerosol_optical_depth"] = hourly_aerosol_optical_depth
-        hourly_data["dust"] = hourly_dust
-        hourly_data["uv_index"] = hourly_uv_index
-        hourly_data["uv_index_clear_sky"] = hourly_uv_index_clear_sky
-        hourly_data["ammonia"] = hourly_ammonia
-        hourly_data["alder_pollen"] = hourly_alder_pollen
-        hourly_data["birch_pollen"] = hourly_birch_pollen
-        hourly_data["grass_pollen"] = hourly_grass_pollen
-        hourly_data["mugwort_pollen"] = hourly_mugwort_pollen
-        hourly_data["olive_pollen"] = hourly_olive_pollen
-        hourly_data["ragweed_pollen"] = hourly_ragweed_pollen
-        hourly_data["us_aqi"] = hourly_us_aqi
-        hourly_data["us_aqi_pm2_5"] = hourly_us_aqi_pm2_5
-        hourly_data["us_aqi_pm10"] = hourly_us_aqi_pm10
-        hourly_data["us_aqi_nitrogen_dioxide"] = hourly_us_aqi_nitrogen_dioxide
-        hourly_data["us_aqi_carbon_monoxide"] = hourly_us_aqi_carbon_monoxide
-        hourly_data["us_aqi_ozone"] = hourly_us_aqi_ozone
-        hourly_data["us_aqi_sulphur_dioxide"] = hourly_us_aqi_sulphur_dioxide
+def update_Solar_Soil_data(cities=None):
+    update_hourly_open_meteo("Solar_Soil", cities)
 
-        hourly_dataframe = pd.DataFrame(data = hourly_data)
-        return hourly_dataframe
+def update_Air_Quality_data(cities=None):
+    update_hourly_open_meteo("Air_Quality", cities)
 
-    # Get city dict
+def migrate_data_to_store(cities=None):
+    # one-off: copy every source csv into the partitioned store, updates and loaders then use the store
     city_info = get_city_info()
+    city_list = list(city_info.keys()) if cities is None else list(cities)
+    for city in city_list:
+        for key in ["noaa", "om", "wrh", "ss", "aq"]:
+            path = city_info[city][key]
+            if os.path.exists(path):
+                migrate_csv_to_store(path)
+
+# Ingestion orchestrator
+# The five sources live on independent hosts, so every (source, city) pair can be fetched at the same time.
+# Each host gets its own thread pool sized to its concurrency limit, so a slow host never blocks the others
+# and no single API is hit harder than we allow. Wall time is then bounded by the slowest source.
+HOST_LIMITS = {
+    "data.rcc-acis.org": 1,
+    "archive-api.open-meteo.com": 1,
+    "air-quality-api.open-meteo.com": 1,
+    "api.mesowest.net": 2,
+}
+
+def get_ingestion_sources():
+    # source name -> (update function, host it talks to, whether one call covers every city)
+    return {
+        "NOAA": (update_NOAA_data, "data.rcc-acis.org", True),
+        "OM": (update_OM_data, "archive-api.open-meteo.com", True),
+        "WRH": (update_WRH_data, "api.mesowest.net", False),
+        "Solar_Soil": (update_Solar_Soil_data, "archive-api.open-meteo.com", True),
+        "Air_Quality": (update_Air_Quality_data, "air-quality-api.open-meteo.com", True),
+    }
+
+def update_all_data(sources=None, cities=None, num_retries=10, retry_wait=10):
+    run_id = new_run_id()
+    all_sources = get_ingestion_sources()
+    if sources is None:
+        sources = list(all_sources.keys())
+    if cities is None:
+        cities = list(get_city_info().keys())
     
-    # city_list
-    city_list = list(city_info.keys())
+    def run_task(source, task_cities):
+        update_function = all_sources[source][0]
+        label = ", ".join(task_cities)
+        # everything the task does (fetch, parse, write) is logged under this source and these cities
+        with telemetry_stage("task", source=source, cities=label):
+            for i in range(num_retries):
+                try:
+                    update_function(cities=task_cities)
+                    return
+                except DailyBudgetExceeded as e:
+                    # retrying can't help before the budget resets, the task is recorded as failed right away
+                    print(f"[{source} - {label}] {e}, not retrying")
+                    add_metric("budget_stops")
+                    raise
+                except Exception as e:
+                    print(f"[{source} - {label}] Error: {e}")
+                    print(f"[{source} - {label}] Retrying... {i+1}/{num_retries}")
+                    add_metric("retries")
+                    timed_sleep(retry_wait)
+            raise RuntimeError(f"{source} update for {label} failed after {num_retries} retries")
     
-    for city in city_list:
-        city_file = f"./data/{city}_Air_Quality.csv"
-        latitude = city_info[city]["lat"]
-        longitude = city_info[city]["lon"]
-        timezone = get_time_zone(city)
-        old_df = pd.read_csv(city_file)
-        old_df["date"] = pd.to_datetime(old_df["date"])
-        
-        start = old_df["date"].max().date()
-        
-        end = pd.to_datetime("now").date()
-        
-        day_diff = (end - start).days
-        
-        new_df = get_historical_data(latitude, longitude, start, end, timezone)
-        new_df['date'] = pd.to_datetime(new_df['date'])
-        new_df["date"] = new_df["date"].dt.tz_convert(timezone)
-        
-        last_date = old_df['date'].iloc[-1]
-        new_df = new_df[new_df['date'] > last_date]
-        new_df = new_df[new_df['date'].dt.date < end]
-        new_df = pd.concat([old_df, new_df], ignore_index=True)
-        new_df.to_csv(city_file, index=False)
-        time.sleep(60)
\ No newline at end of file
+    # one pool per host, sized to that host's limit
+    hosts = {all_sources[source][1] for source in sources}
+    executors = {host: ThreadPoolExecutor(max_workers=HOST_LIMITS.get(host, 1)) for host in hosts}
+    futures = {}
+    failures = {}
+    try:
+        for source in sources:
+            _, host, batched = all_sources[source]
+            # batched sources fetch every city in one request, the rest get one task per city
+            tasks = [list(cities)] if batched else [[city] for city in cities]
+            for task_cities in tasks:
+                future = executors[host].submit(run_task, source, task_cities)
+                futures[future] = (source, ", ".join(task_cities))
+        
+        for future in as_completed(futures):
+            source, label = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failures[(source, label)] = e
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+    
+    print(get_rate_limit_report().to_string(index=False))
+    # per source/stage timings, bytes and rows for this run, the full history stays in TELEMETRY_LOG
+    print(summarize_telemetry(run_id).to_string(index=False))
+    if failures:
+        print(f"Data update finished with {len(failures)} failed task(s): {sorted(failures.keys())}")
+    else:
+        print("Data updated successfully!")
+    return failures